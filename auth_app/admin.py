@@ -1,12 +1,22 @@
 from django.contrib import admin
-from .models import Product, Order, OrderItem
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .exports import FORMATS, iter_orders
+from .models import DailySales, Job, Product, Order, OrderItem
+from .search import search_filter
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("name", "price")
+    list_display = ("name", "sku", "price", "stock")
     search_fields = ("name",)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(search_filter(search_term)), False
+
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -19,4 +29,83 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "status", "created_at", "total_price")
     list_filter = ("status", "created_at")
     search_fields = ("user__username", "user__email")
+    list_select_related = ("user",)
+    ordering = ("-created_at",)
     inlines = [OrderItemInline]
+    actions = ["export_csv", "export_jsonl"]
+
+    @admin.display(description="مبلغ کل", ordering="total")
+    def total_price(self, obj):
+        return obj.total
+
+    def export(self, queryset, fmt):
+        # فیلترهای وضعیت و تاریخ changelist روی queryset اعمال شده‌اند؛
+        # خروجی جریانی است تا سفارش‌های زیاد حافظه و زمان worker را نگیرند
+        lines, content_type = FORMATS[fmt]
+        response = StreamingHttpResponse(lines(iter_orders(queryset)), content_type=content_type)
+        filename = f"orders-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.action(description="خروجی CSV سفارش‌های انتخاب‌شده")
+    def export_csv(self, request, queryset):
+        return self.export(queryset, "csv")
+
+    @admin.action(description="خروجی JSONL سفارش‌های انتخاب‌شده")
+    def export_jsonl(self, request, queryset):
+        return self.export(queryset, "jsonl")
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    """
+    داشبورد فروش؛ فقط از جدول جمع روزانه می‌خواند، نه از اقلام سفارش.
+    """
+    list_display = ("day", "product", "units", "revenue", "orders")
+    list_select_related = ("product",)
+    date_hierarchy = "day"
+    ordering = ("-day", "-revenue")
+
+    # این جدول را auth_app.sales پر می‌کند
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            queryset = response.context_data["cl"].queryset
+        except (AttributeError, KeyError):
+            return response
+
+        totals = ("units", "revenue", "orders")
+        response.context_data["sales_total"] = queryset.aggregate(**{f: Sum(f) for f in totals})
+        response.context_data["sales_by_day"] = (
+            queryset.values("day").annotate(**{f: Sum(f) for f in totals}).order_by("-day")[:31]
+        )
+        response.context_data["top_products"] = (
+            queryset.values("product_id", "product__name")
+            .annotate(**{f: Sum(f) for f in totals})
+            .order_by("-revenue")[:10]
+        )
+        return response
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at", "locked_by", "created_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("attempts", "locked_by", "locked_at", "last_error", "created_at")
+    actions = ["retry"]
+
+    @admin.action(description="اجرای دوباره کارهای انتخاب‌شده")
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), last_error="",
+        )
+        self.message_user(request, f"{updated} کار دوباره در صف قرار گرفت.")
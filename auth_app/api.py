@@ -0,0 +1,141 @@
+import json
+
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from . import catalog
+from .cart_store import get_cart
+from .models import Product
+
+
+MAX_BATCH_OPERATIONS = 100
+
+CART_OPERATIONS = ("add", "set", "remove")
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+def _error(message, status=400):
+    return _json({"error": message}, status=status)
+
+
+def _product_data(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "in_stock": product.in_stock,
+        "image": product.thumbnail_url,
+    }
+
+
+def _cart_data(store):
+    lines = store.lines()
+    products = Product.objects.in_bulk(list(lines))
+
+    items = []
+    for product_id, quantity in lines.items():
+        product = products.get(product_id)
+        if product is None:
+            continue
+        items.append({
+            "product": _product_data(product),
+            "quantity": quantity,
+            "total_price": product.price * quantity,
+        })
+
+    return {
+        "items": items,
+        "count": sum(item["quantity"] for item in items),
+        "total_price": sum(item["total_price"] for item in items),
+    }
+
+
+@require_GET
+def products(request):
+    # مثل صفحه‌های HTML، پارامترها نرمال می‌شوند تا هر شکل نوشتن یک کرسر
+    # یا sort نامعتبر نسخه جدایی در کش نسازد؛ کرسر خراب اینجا خطاست
+    sort, after, before = catalog.catalog_params(request.GET)
+    if (request.GET.get("after") and not after) or (not after and request.GET.get("before") and not before):
+        return _error("کرسر صفحه‌بندی نامعتبر است.")
+
+    page = catalog.get_product_page(sort, after=after, before=before)
+    return _json({
+        "results": [_product_data(p) for p in page.object_list],
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+
+
+@require_GET
+def cart(request):
+    return _json(_cart_data(get_cart(request)))
+
+
+def _parse_operations(body):
+    """
+    عملیات‌های batch را بررسی می‌کند و لیست (op, product_id, quantity) برمی‌گرداند.
+    """
+    try:
+        operations = json.loads(body).get("operations")
+    except (ValueError, AttributeError):
+        raise ValueError("بدنه درخواست باید JSON معتبر باشد.")
+
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("لیست operations خالی یا نامعتبر است.")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"حداکثر {MAX_BATCH_OPERATIONS} عملیات در هر درخواست مجاز است.")
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in CART_OPERATIONS:
+            raise ValueError("نوع عملیات نامعتبر است.")
+
+        product_id = operation.get("product_id")
+        quantity = operation.get("quantity", 1)
+        if not isinstance(product_id, int) or not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise ValueError("product_id و quantity باید عدد صحیح باشند.")
+        if quantity < 0 or (operation["op"] == "add" and quantity == 0):
+            raise ValueError("quantity نامعتبر است.")
+
+        parsed.append((operation["op"], product_id, quantity))
+    return parsed
+
+
+@require_POST
+def cart_batch(request):
+    """
+    چند تغییر سبد خرید در یک درخواست؛ مثلا:
+    {"operations": [{"op": "add", "product_id": 1, "quantity": 2},
+                    {"op": "set", "product_id": 2, "quantity": 5},
+                    {"op": "remove", "product_id": 3}]}
+    """
+    if not request.user.is_authenticated:
+        return _error("برای تغییر سبد خرید باید وارد شوید.", status=401)
+
+    try:
+        operations = _parse_operations(request.body)
+    except ValueError as exc:
+        return _error(str(exc))
+
+    added_ids = {product_id for op, product_id, _ in operations if op != "remove"}
+    prices = dict(Product.objects.filter(id__in=added_ids).values_list("id", "price"))
+    missing = added_ids - prices.keys()
+    if missing:
+        return _error(f"محصول پیدا نشد: {sorted(missing)}", status=404)
+
+    store = get_cart(request)
+    with transaction.atomic():
+        for op, product_id, quantity in operations:
+            if op == "add":
+                store.add(product_id, quantity, price=prices[product_id])
+            elif op == "set":
+                store.set(product_id, quantity, price=prices.get(product_id))
+            else:
+                store.remove([product_id])
+
+    return _json(_cart_data(store))
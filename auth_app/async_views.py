@@ -0,0 +1,68 @@
+"""
+نسخه‌های async از viewهای فقط‌خواندنی کاتالوگ و سبد خرید، برای اجرا روی
+ASGI (shop/asgi.py). با ASYNC_CATALOG_VIEWS=1 در url.py جایگزین viewهای
+sync می‌شوند.
+"""
+from django.http import Http404
+from django.shortcuts import render
+
+from . import catalog
+from .cart_store import acart_summary, aget_cart
+from .models import Product
+from .routers import replica_reads
+
+
+async def _resolve_user(request):
+    # کاربر، session و خلاصه سبد را async بارگذاری می‌کنیم تا context processorها
+    # (auth، messages و cart) هنگام رندر کوئری sync نزنند.
+    request.user = await request.auser()
+    request.cart_summary = await acart_summary(request)
+
+
+async def _catalog_context(request):
+    sort, after, before = catalog.catalog_params(request.GET)
+    return {
+        "sort": sort,
+        "catalog_html": await catalog.arender_product_grid(sort, after=after, before=before),
+    }
+
+
+@replica_reads
+@catalog.acache_anonymous_page
+async def home(request):
+    await _resolve_user(request)
+    return render(request, 'auth_app/home.html', await _catalog_context(request))
+
+
+@replica_reads
+@catalog.acache_anonymous_page
+async def products(request):
+    await _resolve_user(request)
+    return render(request, 'auth_app/home.html', await _catalog_context(request))
+
+
+@replica_reads
+@catalog.acache_anonymous_page
+async def ProductDetail(request, pk):
+    await _resolve_user(request)
+    product = await catalog.aget_product(pk)
+    if product is None:
+        raise Http404("محصول پیدا نشد.")
+    return render(request, 'auth_app/detail.html', {'product': product})
+
+
+async def cart(request):
+    await _resolve_user(request)
+    cart_items = await (await aget_cart(request)).alines()
+    cart_details = []
+
+    async for product in Product.objects.filter(id__in=cart_items.keys()):
+        quantity = cart_items[product.id]
+        cart_details.append({
+            'product': product,
+            'quantity': quantity,
+            'total_price': product.price * quantity,
+        })
+
+    total_cart_price = sum(item['total_price'] for item in cart_details)
+    return render(request, 'auth_app/cart.html', {'cart_details': cart_details, 'total_cart_price': total_cart_price})
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Func, Q, Value
+from django.db.models.functions import Upper
+
+
+# همان عبارت‌هایی که ایندکس‌های auth_user در مایگریشن 0012 روی آن‌ها ساخته شده‌اند؛
+# اگر کوئری عبارت دیگری بسازد (مثلا iexact روی SQLite که LIKE است) ایندکس استفاده نمی‌شود.
+USERNAME_KEY = Upper("username")
+
+# ایمیل خالی در ایندکس یکتا نیست (NULLIF آن را NULL می‌کند)؛ '' باید در خود SQL
+# بیاید نه به صورت پارامتر تا عبارت دقیقا با ایندکس یکی باشد
+EMAIL_KEY = Func(Upper("email"), template="NULLIF(%(expressions)s, '')")
+
+
+def users_by_login(login):
+    """
+    کاربرانی که نام کاربری یا ایمیلشان (بدون حساسیت به حروف) برابر login است؛ یک کوئری.
+    """
+    key = Upper(Value(login))
+    return get_user_model()._default_manager.alias(
+        username_key=USERNAME_KEY, email_key=EMAIL_KEY,
+    ).filter(Q(username_key=key) | Q(email_key=key))
+
+
+def _priority(login):
+    # تطابق دقیق نام کاربری، بعد نام کاربری بدون حروف بزرگ/کوچک، بعد ایمیل
+    def priority(user):
+        if user.username == login:
+            return 0
+        if user.username.upper() == login.upper():
+            return 1
+        return 2
+    return priority
+
+
+def resolve_login(login, request=None):
+    """
+    کاربری که ورود با login برای او بررسی می‌شود، یا None؛ یک کوئری.
+    با request نتیجه روی آن نگه داشته می‌شود تا محدودیت ورود (throttle) و
+    authenticate در همان درخواست دو بار کوئری نزنند.
+    """
+    resolved = getattr(request, "_resolved_login", None)
+    if resolved is not None and resolved[0] == login:
+        return resolved[1]
+
+    candidates = sorted(users_by_login(login), key=_priority(login))
+    user = candidates[0] if candidates else None
+    if request is not None:
+        request._resolved_login = (login, user)
+    return user
+
+
+def email_exists(email):
+    return get_user_model()._default_manager.alias(email_key=EMAIL_KEY).filter(
+        email_key=Upper(Value(email)),
+    ).exists()
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    ورود با نام کاربری یا ایمیل در یک کوئری ایندکس‌دار.
+    اگر چند کاربر پیدا شوند، تطابق دقیق نام کاربری بر تطابق بدون حروف بزرگ/کوچک
+    و آن هم بر ایمیل مقدم است.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = resolve_login(username, request)
+        if user is None:
+            # مثل ModelBackend؛ هش رمز اجرا می‌شود تا زمان پاسخ وجود کاربر را لو ندهد
+            UserModel().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,321 @@
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils.module_loading import import_string
+
+from . import catalog
+from .models import Cart, CartLine
+
+
+EMPTY_SUMMARY = {"lines": 0, "units": 0, "subtotal": 0}
+
+SUMMARY_KEY = "cart-summary:{}"
+
+
+def forget_summaries(cart_ids):
+    """
+    خلاصه سبدهایی که ردیف‌هایشان بیرون از DatabaseCartStore عوض شده‌اند (حذف
+    محصول یا کاربر، admin) از کش پاک می‌شود؛ یک بار همین حالا و یک بار بعد از
+    commit تا خلاصه‌ای که در این فاصله از داده قدیمی ساخته شده نماند.
+    """
+    keys = [SUMMARY_KEY.format(cart_id) for cart_id in set(cart_ids)]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(partial(cache.delete_many, keys))
+
+
+class BaseCartStore:
+    """
+    رابط مشترک نگهداری سبد خرید. lines() دیکشنری {product_id: quantity} است.
+    price در add/set قیمت لحظه افزودن است که جمع summary() با آن حساب می‌شود؛
+    اگر داده نشود از کش کاتالوگ خوانده می‌شود.
+    """
+
+    def lines(self):
+        raise NotImplementedError
+
+    async def alines(self):
+        return await sync_to_async(self.lines)()
+
+    def summary(self):
+        """
+        {"lines": تعداد ردیف، "units": تعداد کالا، "subtotal": جمع با قیمت زمان افزودن}
+        """
+        raise NotImplementedError
+
+    async def asummary(self):
+        return await sync_to_async(self.summary)()
+
+    def add(self, product_id, quantity=1, price=None):
+        raise NotImplementedError
+
+    def set(self, product_id, quantity, price=None):
+        raise NotImplementedError
+
+    def remove(self, product_ids):
+        """
+        تعداد ردیف‌های حذف‌شده را برمی‌گرداند.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def _price(product_id, price):
+        if price is None:
+            product = catalog.get_product(product_id)
+            price = product.price if product else 0
+        return price
+
+
+def _summarize(lines, prices):
+    return {
+        "lines": len(lines),
+        "units": sum(lines.values()),
+        "subtotal": sum(quantity * prices.get(product_id, 0) for product_id, quantity in lines.items()),
+    }
+
+
+class DatabaseCartStore(BaseCartStore):
+    """
+    هر ردیف سبد یک CartLine است؛ هر تغییر فقط یک ردیف را می‌نویسد.
+    خلاصه سبد در کش نگه داشته و بعد از هر تغییر (پس از commit) دوباره ساخته
+    می‌شود تا navbar صفحه‌ها بدون کوئری آن را نشان دهد. نوشتن‌های دیگر CartLine
+    (حذف آبشاری با محصول یا کاربر، save مستقیم) با سیگنال‌های auth_app.signals
+    خلاصه را پاک می‌کنند.
+    """
+
+    def __init__(self, user):
+        self.cart_id = user.pk
+        self.summary_key = SUMMARY_KEY.format(user.pk)
+        self._refresh_pending = False
+
+    def lines(self):
+        return dict(CartLine.objects.filter(cart_id=self.cart_id).values_list("product_id", "quantity"))
+
+    async def alines(self):
+        rows = CartLine.objects.filter(cart_id=self.cart_id).values_list("product_id", "quantity")
+        return {product_id: quantity async for product_id, quantity in rows}
+
+    def summary(self):
+        summary = cache.get(self.summary_key)
+        if summary is None:
+            summary = self._refresh_summary()
+        return summary
+
+    async def asummary(self):
+        summary = await cache.aget(self.summary_key)
+        if summary is None:
+            summary = await sync_to_async(self._refresh_summary)()
+        return summary
+
+    def _refresh_summary(self):
+        self._refresh_pending = False
+        summary = CartLine.objects.filter(cart_id=self.cart_id).aggregate(
+            lines=Count("id"),
+            units=Sum("quantity", default=0),
+            subtotal=Sum(F("quantity") * F("price"), default=0),
+        )
+        cache.set(self.summary_key, summary, settings.CART_CACHE_TIMEOUT)
+        return summary
+
+    def _changed(self):
+        # خلاصه قدیمی همین حالا پاک می‌شود؛ خلاصه تازه بعد از commit ساخته می‌شود
+        # تا تراکنشی که برمی‌گردد (مثلا checkout ناموفق) خلاصه غلط در کش نگذارد
+        cache.delete(self.summary_key)
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            transaction.on_commit(self._refresh_summary)
+
+    def _insert_or(self, product_id, quantity, price, update):
+        # حالت رایج (ردیف موجود) فقط یک UPDATE است
+        if not update():
+            try:
+                with transaction.atomic():
+                    Cart.objects.get_or_create(pk=self.cart_id)
+                    CartLine.objects.create(cart_id=self.cart_id, product_id=product_id, quantity=quantity, price=price)
+            except IntegrityError:
+                # درخواست هم‌زمان ردیف را زودتر ساخته است
+                update()
+        self._changed()
+
+    def add(self, product_id, quantity=1, price=None):
+        price = self._price(product_id, price)
+        line = CartLine.objects.filter(cart_id=self.cart_id, product_id=product_id)
+        self._insert_or(product_id, quantity, price, lambda: line.update(quantity=F("quantity") + quantity, price=price))
+
+    def set(self, product_id, quantity, price=None):
+        if quantity <= 0:
+            return self.remove([product_id])
+        price = self._price(product_id, price)
+        line = CartLine.objects.filter(cart_id=self.cart_id, product_id=product_id)
+        self._insert_or(product_id, quantity, price, lambda: line.update(quantity=quantity, price=price))
+
+    def remove(self, product_ids):
+        deleted, _ = CartLine.objects.filter(cart_id=self.cart_id, product_id__in=product_ids).delete()
+        if deleted:
+            self._changed()
+        return deleted
+
+    def clear(self):
+        CartLine.objects.filter(cart_id=self.cart_id).delete()
+        self._changed()
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    سبد در کش مشترک (مثلاً redis) نگه داشته می‌شود؛ سریع اما ماندگاری‌اش
+    به تنظیمات کش بستگی دارد.
+
+    هر تغییر خواندن-تغییر-نوشتن کل سبد است و با قفل کش (cache.add) پشت سر هم
+    انجام می‌شود تا دو درخواست هم‌زمان تغییر همدیگر را پاک نکنند؛ پس بک‌اند کش
+    باید add اتمی داشته باشد (redis، memcached). کش فایلی این تضمین را ندارد.
+    """
+
+    # قفل رها‌نشده (مثلا worker وسط تغییر کشته شد) بعد از این مدت (ثانیه) باز می‌شود
+    lock_timeout = 5
+
+    def __init__(self, user):
+        self.key = f"cart:{user.pk}"
+        self.prices_key = f"cart-prices:{user.pk}"
+        self.lock_key = f"cart-lock:{user.pk}"
+
+    def lines(self):
+        return cache.get(self.key, {})
+
+    def _load(self):
+        values = cache.get_many([self.key, self.prices_key])
+        return values.get(self.key, {}), values.get(self.prices_key, {})
+
+    def summary(self):
+        return _summarize(*self._load())
+
+    def _save(self, lines, prices):
+        cache.set_many({self.key: lines, self.prices_key: prices}, settings.CART_CACHE_TIMEOUT)
+
+    @contextmanager
+    def _locked(self):
+        while not cache.add(self.lock_key, 1, self.lock_timeout):
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            cache.delete(self.lock_key)
+
+    def add(self, product_id, quantity=1, price=None):
+        price = self._price(product_id, price)
+        with self._locked():
+            lines, prices = self._load()
+            lines[product_id] = lines.get(product_id, 0) + quantity
+            prices[product_id] = price
+            self._save(lines, prices)
+
+    def set(self, product_id, quantity, price=None):
+        if quantity <= 0:
+            return self.remove([product_id])
+        price = self._price(product_id, price)
+        with self._locked():
+            lines, prices = self._load()
+            lines[product_id] = quantity
+            prices[product_id] = price
+            self._save(lines, prices)
+
+    def remove(self, product_ids):
+        with self._locked():
+            lines, prices = self._load()
+            removed = [lines.pop(product_id) for product_id in product_ids if product_id in lines]
+            if removed:
+                for product_id in product_ids:
+                    prices.pop(product_id, None)
+                self._save(lines, prices)
+        return len(removed)
+
+    def clear(self):
+        with self._locked():
+            cache.delete_many([self.key, self.prices_key])
+
+
+class SessionCartStore(BaseCartStore):
+    """
+    سبد داخل session؛ برای کاربران مهمان استفاده می‌شود.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def lines(self):
+        return {int(pid): qty for pid, qty in self.session.get("cart", {}).items()}
+
+    def _prices(self):
+        return {int(pid): price for pid, price in self.session.get("cart_prices", {}).items()}
+
+    def summary(self):
+        return _summarize(self.lines(), self._prices())
+
+    def _save(self, lines, prices):
+        self.session["cart"] = {str(pid): qty for pid, qty in lines.items()}
+        self.session["cart_prices"] = {str(pid): prices[pid] for pid in lines if pid in prices}
+
+    def add(self, product_id, quantity=1, price=None):
+        lines, prices = self.lines(), self._prices()
+        lines[product_id] = lines.get(product_id, 0) + quantity
+        prices[product_id] = self._price(product_id, price)
+        self._save(lines, prices)
+
+    def set(self, product_id, quantity, price=None):
+        if quantity <= 0:
+            return self.remove([product_id])
+        lines, prices = self.lines(), self._prices()
+        lines[product_id] = quantity
+        prices[product_id] = self._price(product_id, price)
+        self._save(lines, prices)
+
+    def remove(self, product_ids):
+        lines = self.lines()
+        removed = [lines.pop(product_id) for product_id in product_ids if product_id in lines]
+        if removed:
+            self._save(lines, self._prices())
+        return len(removed)
+
+    def clear(self):
+        if self.session.get("cart"):
+            self.session["cart"] = {}
+            self.session["cart_prices"] = {}
+
+
+def for_user(user):
+    return import_string(settings.CART_STORE)(user)
+
+
+def get_cart(request):
+    if request.user.is_authenticated:
+        return for_user(request.user)
+    return SessionCartStore(request.session)
+
+
+async def aget_cart(request):
+    user = await request.auser()
+    if user.is_authenticated:
+        return for_user(user)
+    return SessionCartStore(request.session)
+
+
+def cart_summary(request):
+    # مهمان‌ها نمی‌توانند چیزی به سبد اضافه کنند؛ session آن‌ها هم باز نمی‌شود
+    if not request.user.is_authenticated:
+        return EMPTY_SUMMARY
+    return get_cart(request).summary()
+
+
+async def acart_summary(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return EMPTY_SUMMARY
+    return await for_user(user).asummary()
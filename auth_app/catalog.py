@@ -0,0 +1,307 @@
+import hashlib
+import random
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+from django.utils.safestring import mark_safe
+
+from .jobs import task
+from .models import Product
+from .pagination import apaginate_keyset, decode_cursor, encode_cursor, paginate_keyset
+
+
+VERSION_KEY = "catalog:version"
+HITS_KEY = "catalog:hits"
+MISSES_KEY = "catalog:misses"
+
+CATALOG_ORDERINGS = {
+    "id": ("id",),
+    "price": ("price", "id"),
+}
+
+# محصول ناموجود هم کش می‌شود تا 404های تکراری به دیتابیس نرسند
+MISSING = "missing"
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # اگر کلید نسخه از کش پاک شود، نسخه جدید از همه نسخه‌های قبلی بزرگ‌تر است
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+@task
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate():
+    """
+    بعد از تغییر محصولات صدا زده می‌شود. نسخه یک بار همین حالا و یک بار بعد از
+    commit عوض می‌شود تا درخواستی که بین این دو داده قدیمی را خوانده و کش کرده،
+    آن را زیر نسخه جدید نگه ندارد. با replica، خواندن‌های کاتالوگ تا
+    REPLICA_PIN_SECONDS بعد از commit هم ممکن است داده قدیمی ببینند؛ پس یک بار
+    دیگر بعد از آن (با صف کارها) عوض می‌شود.
+    """
+    bump_version()
+    transaction.on_commit(bump_version)
+    if settings.DATABASE_REPLICAS:
+        bump_version.enqueue(delay=settings.REPLICA_PIN_SECONDS)
+
+
+def _sampled():
+    rate = settings.CATALOG_STATS_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def _count(key):
+    # شمارنده‌ها در کش جدای stats هستند و فقط برای نمونه‌ای از درخواست‌ها
+    # نوشته می‌شوند تا هر درخواست یک نوشتن مشترک اضافه نداشته باشد
+    if not _sampled():
+        return
+    stats_cache = caches["stats"]
+    try:
+        stats_cache.incr(key)
+    except ValueError:
+        stats_cache.add(key, 0, None)
+        stats_cache.incr(key)
+
+
+def stats():
+    """
+    تعداد hit و miss نمونه‌برداری‌شده (CATALOG_STATS_SAMPLE_RATE) کش کاتالوگ.
+    """
+    counters = caches["stats"].get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": counters.get(HITS_KEY, 0), "misses": counters.get(MISSES_KEY, 0)}
+
+
+def make_key(name, *parts):
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f"catalog:{get_version()}:{name}:{digest}"
+
+
+def _normalize_cursor(cursor, ordering):
+    values = decode_cursor(cursor, Product, ordering) if cursor else None
+    if values is None:
+        return None
+    return encode_cursor(Product(**dict(zip(ordering, values))), ordering)
+
+
+def catalog_params(query):
+    """
+    (sort, after, before) نرمال‌شده از query string صفحه‌های کاتالوگ: sort نامعتبر
+    همان id است، کرسر خراب مثل نبودنش است و مثل paginate_keyset اگر after
+    معتبر باشد before نادیده گرفته می‌شود.
+    """
+    sort = query.get("sort")
+    if sort not in CATALOG_ORDERINGS:
+        sort = "id"
+    after = _normalize_cursor(query.get("after"), CATALOG_ORDERINGS[sort])
+    before = None if after else _normalize_cursor(query.get("before"), CATALOG_ORDERINGS[sort])
+    return sort, after, before
+
+
+def _page_key_parts(request):
+    # پارامترهای دیگر query string (utm_*، ...) صفحه را عوض نمی‌کنند و نباید
+    # برای هر مقدارشان یک نسخه جدا در کش بسازند
+    return (request.path, *catalog_params(request.GET))
+
+
+def get_or_build(name, parts, builder):
+    key = make_key(name, *parts)
+    value = cache.get(key)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+
+    _count(MISSES_KEY)
+    value = builder()
+    cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def get_product_page(sort, after=None, before=None):
+    def build():
+        return paginate_keyset(Product.objects.all(), CATALOG_ORDERINGS[sort], after=after, before=before)
+
+    return get_or_build("page", (sort, after, before, settings.PRODUCTS_PER_PAGE), build)
+
+
+def get_product(pk):
+    """
+    محصول با این pk یا None اگر وجود نداشته باشد.
+    """
+    def build():
+        return Product.objects.filter(pk=pk).first() or MISSING
+
+    product = get_or_build("product", (pk,), build)
+    return None if product == MISSING else product
+
+
+def _render_grid(sort, page):
+    next_query = previous_query = None
+    if page.has_next:
+        next_query = urlencode({"sort": sort, "after": page.next_cursor})
+    if page.has_previous:
+        previous_query = urlencode({"sort": sort, "before": page.previous_cursor})
+
+    return str(render_to_string("auth_app/_product_grid.html", {
+        "products": page.object_list,
+        "next_query": next_query,
+        "previous_query": previous_query,
+    }))
+
+
+def render_product_grid(sort, after=None, before=None):
+    """
+    HTML شبکه محصولات و لینک‌های صفحه‌بندی؛ برای همه کاربران یکسان است،
+    پس یک بار رندر و کش می‌شود.
+    """
+    def build():
+        return _render_grid(sort, get_product_page(sort, after=after, before=before))
+
+    html = get_or_build("grid", (sort, after, before, settings.PRODUCTS_PER_PAGE), build)
+    return mark_safe(html)
+
+
+def _page_cacheable(request, user):
+    return (
+        settings.CATALOG_PAGE_CACHE
+        and request.method == "GET"
+        and not user.is_authenticated
+        and not len(messages.get_messages(request))
+    )
+
+
+def _response_cacheable(response):
+    return response.status_code == 200 and not response.cookies
+
+
+def cache_anonymous_page(view):
+    """
+    کل صفحه را برای کاربران مهمان کش می‌کند. کاربران واردشده و درخواست‌هایی
+    که پیام (messages) دارند، صفحه را تازه رندر می‌کنند چون navbar و پیام‌ها
+    به کاربر بستگی دارند.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _page_cacheable(request, request.user):
+            return view(request, *args, **kwargs)
+
+        key = make_key("anonymous-page", *_page_key_parts(request))
+        cached = cache.get(key)
+        if cached is not None:
+            _count(HITS_KEY)
+            response = HttpResponse(cached[0], content_type=cached[1])
+        else:
+            _count(MISSES_KEY)
+            response = view(request, *args, **kwargs)
+            if _response_cacheable(response):
+                cache.set(key, (response.content, response["Content-Type"]), settings.CATALOG_CACHE_TIMEOUT)
+
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+    return wrapper
+
+
+# نسخه‌های async برای viewهای async (ASGI). بک‌اندهای کش جنگو متدهای
+# async دارند (aget, aset, ...) و کوئری‌ها با ORM async اجرا می‌شوند.
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def _acount(key):
+    if not _sampled():
+        return
+    stats_cache = caches["stats"]
+    try:
+        await stats_cache.aincr(key)
+    except ValueError:
+        await stats_cache.aadd(key, 0, None)
+        await stats_cache.aincr(key)
+
+
+async def amake_key(name, *parts):
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f"catalog:{await aget_version()}:{name}:{digest}"
+
+
+async def aget_or_build(name, parts, builder):
+    key = await amake_key(name, *parts)
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount(HITS_KEY)
+        return value
+
+    await _acount(MISSES_KEY)
+    value = await builder()
+    await cache.aset(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+async def aget_product_page(sort, after=None, before=None):
+    async def build():
+        return await apaginate_keyset(Product.objects.all(), CATALOG_ORDERINGS[sort], after=after, before=before)
+
+    return await aget_or_build("page", (sort, after, before, settings.PRODUCTS_PER_PAGE), build)
+
+
+async def aget_product(pk):
+    async def build():
+        return await Product.objects.filter(pk=pk).afirst() or MISSING
+
+    product = await aget_or_build("product", (pk,), build)
+    return None if product == MISSING else product
+
+
+async def arender_product_grid(sort, after=None, before=None):
+    async def build():
+        return _render_grid(sort, await aget_product_page(sort, after=after, before=before))
+
+    html = await aget_or_build("grid", (sort, after, before, settings.PRODUCTS_PER_PAGE), build)
+    return mark_safe(html)
+
+
+def acache_anonymous_page(view):
+    """
+    نسخه async از cache_anonymous_page.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not _page_cacheable(request, await request.auser()):
+            return await view(request, *args, **kwargs)
+
+        key = await amake_key("anonymous-page", *_page_key_parts(request))
+        cached = await cache.aget(key)
+        if cached is not None:
+            await _acount(HITS_KEY)
+            response = HttpResponse(cached[0], content_type=cached[1])
+        else:
+            await _acount(MISSES_KEY)
+            response = await view(request, *args, **kwargs)
+            if _response_cacheable(response):
+                await cache.aset(key, (response.content, response["Content-Type"]), settings.CATALOG_CACHE_TIMEOUT)
+
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+    return wrapper
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart_store import cart_summary
+
+
+def cart(request):
+    """
+    خلاصه سبد برای navbar؛ فقط اگر قالب از آن استفاده کند خوانده می‌شود و
+    viewهای async آن را از قبل در request.cart_summary می‌گذارند.
+    """
+    summary = getattr(request, "cart_summary", None)
+    if summary is None:
+        summary = SimpleLazyObject(lambda: cart_summary(request))
+    return {"cart_summary": summary}
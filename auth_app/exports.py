@@ -0,0 +1,113 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order, OrderItem
+
+
+EXPORT_CHUNK_SIZE = 2_000
+
+CSV_HEADER = [
+    "order_id", "created_at", "status", "username", "email", "order_total",
+    "product_id", "product_name", "quantity", "price", "line_total",
+]
+
+
+class Echo:
+    """
+    شیء شبه‌فایل برای csv.writer که سطر را به جای نوشتن برمی‌گرداند.
+    """
+
+    def write(self, value):
+        return value
+
+
+def parse_moment(value, end=False):
+    """
+    تاریخ یا تاریخ-زمان ISO را به datetime آگاه از منطقه زمانی تبدیل می‌کند.
+    برای پایان بازه، تاریخ تنها یعنی تا آخر همان روز.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"تاریخ نامعتبر: {value}")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_orders(queryset=None, statuses=None, since=None, until=None):
+    queryset = Order.objects.all() if queryset is None else queryset
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset
+
+
+def iter_orders(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    سفارش‌ها همراه با اقلامشان به صورت تکه‌تکه؛ روی PostgreSQL با cursor سمت
+    سرور خوانده می‌شوند و برای هر تکه فقط یک کوئری prefetch اجرا می‌شود.
+    """
+    items = OrderItem.objects.select_related("product").order_by("id")
+    queryset = (
+        queryset.select_related("user")
+        .prefetch_related(Prefetch("items", queryset=items))
+        .order_by("id")
+    )
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def csv_rows(orders):
+    yield CSV_HEADER
+    for order in orders:
+        head = [
+            order.id, order.created_at.isoformat(), order.status,
+            order.user.username, order.user.email, order.total,
+        ]
+        lines = order.items.all()
+        if not lines:
+            yield head + [""] * 5
+        for item in lines:
+            yield head + [item.product_id, item.product.name, item.quantity, item.price, item.total_price]
+
+
+def csv_lines(orders):
+    writer = csv.writer(Echo())
+    for row in csv_rows(orders):
+        yield writer.writerow(row)
+
+
+def jsonl_lines(orders):
+    for order in orders:
+        yield json.dumps({
+            "id": order.id,
+            "created_at": order.created_at.isoformat(),
+            "status": order.status,
+            "user": {"id": order.user_id, "username": order.user.username, "email": order.user.email},
+            "total": order.total,
+            "items": [
+                {
+                    "product_id": item.product_id,
+                    "product_name": item.product.name,
+                    "quantity": item.quantity,
+                    "price": item.price,
+                }
+                for item in order.items.all()
+            ],
+        }, ensure_ascii=False) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
+from .backends import email_exists
 from .models import Product
 
 
@@ -35,12 +35,18 @@ class RegisterForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get("email")
-        if User.objects.filter(email=email).exists():
+        if email_exists(email):
             raise forms.ValidationError("این ایمیل قبلاً ثبت شده است.")
         return email
 
 
 class EmailAuthenticationForm(AuthenticationForm):
+    # جستجوی کاربر با نام کاربری یا ایمیل در auth_app.backends.EmailOrUsernameBackend انجام می‌شود
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        "invalid_login": "اطلاعات ورود اشتباه است.",
+    }
+
     username = forms.CharField(label="ایمیل یا نام کاربری", widget=forms.TextInput(attrs={
         "class": "form-control",
         "placeholder": "ایمیل یا نام کاربری"
@@ -49,23 +55,3 @@ class EmailAuthenticationForm(AuthenticationForm):
         "class": "form-control",
         "placeholder": "رمز عبور"
     }))
-
-    def clean(self):
-        username_or_email = self.cleaned_data.get("username")
-        password = self.cleaned_data.get("password")
-
-        if username_or_email and password:
-            try:
-                user_obj = User.objects.get(email=username_or_email)
-                username = user_obj.username
-            except User.DoesNotExist:
-                username = username_or_email
-
-            self.user_cache = authenticate(self.request, username=username, password=password)
-
-            if self.user_cache is None:
-                raise forms.ValidationError("اطلاعات ورود اشتباه است.")
-
-            self.confirm_login_allowed(self.user_cache)
-
-        return self.cleaned_data
@@ -0,0 +1,74 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import catalog
+from .models import Product
+
+
+THUMBNAIL_DIR = "products/thumbs"
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _store(data, width, fmt):
+    # نام فایل از محتوای آن ساخته می‌شود؛ هر تغییر نام تازه می‌گیرد و کش مرورگر را
+    # می‌توان برای همیشه نگه داشت
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    name = f"{THUMBNAIL_DIR}/{digest}-{width}.{fmt}"
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return name
+
+
+def build_thumbnails(image_file):
+    """
+    از فایل تصویر برای هر عرض PRODUCT_THUMBNAIL_WIDTHS (تا عرض خود تصویر) نسخه WebP و JPEG می‌سازد.
+    """
+    with Image.open(image_file) as original:
+        original = ImageOps.exif_transpose(original).convert("RGB")
+        width, height = original.size
+
+        widths = [w for w in sorted(settings.PRODUCT_THUMBNAIL_WIDTHS) if w < width]
+        if width <= max(settings.PRODUCT_THUMBNAIL_WIDTHS):
+            widths.append(width)
+        result = {"width": width, "height": height, **{fmt: {} for fmt in FORMATS}}
+        for target in widths:
+            resized = original.resize((target, round(height * target / width)), Image.LANCZOS)
+            for fmt in FORMATS:
+                result[fmt][str(target)] = _store(_encode(resized, fmt), target, fmt)
+    return result
+
+
+def generate(product_id):
+    """
+    تصاویر کوچک یک محصول را می‌سازد، اگر با تصویر فعلی آن نخوانند.
+    """
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None or not product.image or product.thumbnails.get("source") == product.image.name:
+        return False
+
+    with product.image.open("rb") as image_file:
+        thumbnails = build_thumbnails(image_file)
+    thumbnails["source"] = product.image.name
+
+    # فقط اگر تصویر در این فاصله عوض نشده باشد؛ update سیگنال post_save نمی‌فرستد
+    updated = Product.objects.filter(pk=product_id, image=product.image.name).update(thumbnails=thumbnails)
+    if updated:
+        catalog.invalidate()
+    return bool(updated)
+
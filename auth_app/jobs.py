@@ -0,0 +1,140 @@
+"""
+صف کارهای پس‌زمینه روی دیتابیس.
+
+task با دکوراتور task ثبت می‌شود و با task.enqueue(**payload) در صف قرار می‌گیرد؛
+ردیف صف در همان تراکنش درخواست نوشته می‌شود، پس اگر تراکنش برگردد کار هم
+ثبت نمی‌شود و worker آن را فقط بعد از commit می‌بیند. manage.py run_worker کارها را
+برمی‌دارد و اجرا می‌کند؛ چند worker هم‌زمان روی Postgres با SKIP LOCKED کار
+تکراری برنمی‌دارند و روی SQLite تراکنش‌های IMMEDIATE برداشتن را پشت سر هم می‌کنند.
+
+با JOBS_EAGER=True (تست‌ها و توسعه بدون worker) task بعد از commit همان‌جا اجرا می‌شود؛
+کار با delay در یک thread پس‌زمینه بعد از همان تاخیر اجرا می‌شود.
+
+در پروداکشن دست‌کم یک پروسه manage.py run_worker لازم است (worker در Procfile).
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger("auth_app.jobs")
+
+_registry = {}
+
+
+def task(func):
+    name = f"{func.__module__}.{func.__name__}"
+    _registry[name] = func
+    func.enqueue = partial(enqueue, name)
+    return func
+
+
+def enqueue(name, delay=0, max_attempts=None, **payload):
+    """
+    payload باید قابل تبدیل به JSON باشد (شناسه‌ها، نه آبجکت‌ها).
+    """
+    if name not in _registry:
+        raise KeyError(f"task {name} ثبت نشده است")
+    if settings.JOBS_EAGER:
+        func = partial(_registry[name], **payload)
+        transaction.on_commit(partial(_run_later, delay, func) if delay else func)
+        return None
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def _run_later(delay, func):
+    def run():
+        try:
+            func()
+        except Exception:
+            logger.exception("eager job %s failed", func.func.__name__)
+        finally:
+            connections.close_all()
+
+    timer = threading.Timer(delay, run)
+    timer.daemon = True
+    timer.start()
+
+
+def claim(worker, limit=1):
+    """
+    حداکثر limit کار آماده را برای این worker علامت می‌زند و برمی‌گرداند.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by("run_at")
+            .values_list("pk", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by("run_at"))
+
+
+def retry_delay(attempts):
+    # backoff نمایی: ۱۰ ثانیه، ۲۰، ۴۰، ... تا سقف JOB_RETRY_MAX_DELAY
+    return min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+
+
+def run(job):
+    """
+    یک کار برداشته‌شده را اجرا می‌کند؛ موفق حذف می‌شود، ناموفق با تاخیر دوباره
+    در صف می‌رود یا بعد از max_attempts تلاش FAILED می‌ماند.
+    """
+    try:
+        func = _registry[job.name]
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("job %s (%s) failed after %d attempts", job.pk, job.name, job.attempts)
+            fields = {"status": Job.FAILED}
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning("job %s (%s) failed, retrying in %ss", job.pk, job.name, delay)
+            fields = {"status": Job.QUEUED, "run_at": timezone.now() + timedelta(seconds=delay)}
+        Job.objects.filter(pk=job.pk).update(last_error=error, locked_by="", locked_at=None, **fields)
+        return False
+
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def release(claimed):
+    """
+    کارهای برداشته‌شده‌ای که اجرا نشدند (مثلا worker در حال خاموش شدن است) به صف برمی‌گردند.
+    """
+    Job.objects.filter(pk__in=[job.pk for job in claimed], status=Job.RUNNING).update(
+        status=Job.QUEUED, locked_by="", locked_at=None, attempts=F("attempts") - 1,
+    )
+
+
+def requeue_stale():
+    """
+    کارهایی که worker آن‌ها از کار افتاده (بیش از JOB_LOCK_TIMEOUT در حال اجرا) دوباره در صف می‌روند.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, locked_by="", locked_at=None, last_error="worker stopped while running the job",
+    )
+    return stale.update(status=Job.QUEUED, locked_by="", locked_at=None)
@@ -0,0 +1,203 @@
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from auth_app.cart_store import for_user
+from auth_app.models import Order, OrderItem, Product
+from auth_app.url import urlpatterns
+
+
+# هر route یک سناریو دارد: (نیاز به ورود، تابع ساخت درخواست)
+# تابع درخواست (client, ctx) را می‌گیرد و (method, url, data) برمی‌گرداند.
+def _product_id(ctx):
+    return ctx["rng"].choice(ctx["product_ids"])
+
+
+def _checkout(client, ctx):
+    store = for_user(ctx["user"])
+    for product_id in ctx["rng"].sample(ctx["product_ids"], 3):
+        store.set(product_id, 1)
+    return "get", reverse("checkout"), None
+
+
+def _order_detail(client, ctx):
+    if "order_ids" not in ctx:
+        ctx["order_ids"] = list(Order.objects.filter(user=ctx["user"]).values_list("id", flat=True)[:1000])
+        if not ctx["order_ids"]:
+            # seed_data سفارش‌ها را تصادفی پخش می‌کند؛ برای کاربر بی‌سفارش یک سفارش خالی کافی است
+            ctx["order_ids"] = [Order.objects.create(user=ctx["user"]).id]
+    return "get", reverse("order_detail", args=[ctx["rng"].choice(ctx["order_ids"])]), None
+
+
+SCENARIOS = {
+    "home": (False, lambda client, ctx: ("get", reverse("home"), None)),
+    "products": (False, lambda client, ctx: ("get", reverse("products") + "?sort=price", None)),
+    "product_search": (False, lambda client, ctx: ("get", reverse("product_search") + "?q=lap", None)),
+    "product_detail": (False, lambda client, ctx: ("get", reverse("product_detail", args=[_product_id(ctx)]), None)),
+    "register": (False, lambda client, ctx: ("get", reverse("register"), None)),
+    "login": (False, lambda client, ctx: ("get", reverse("login"), None)),
+    "cart": (True, lambda client, ctx: ("get", reverse("cart"), None)),
+    "add_to_cart": (True, lambda client, ctx: ("get", reverse("add_to_cart", args=[_product_id(ctx)]), None)),
+    "remove_from_cart": (True, lambda client, ctx: ("get", reverse("remove_from_cart", args=[_product_id(ctx)]), None)),
+    "add_product": (True, lambda client, ctx: ("get", reverse("add_product"), None)),
+    "checkout": (True, _checkout),
+    "orders": (True, lambda client, ctx: ("get", reverse("orders"), None)),
+    "order_detail": (True, _order_detail),
+    "api_products": (False, lambda client, ctx: ("get", reverse("api_products"), None)),
+    "api_cart": (True, lambda client, ctx: ("get", reverse("api_cart"), None)),
+    "api_cart_batch": (True, lambda client, ctx: ("post", reverse("api_cart_batch"), {
+        "operations": [{"op": "add", "product_id": _product_id(ctx)}, {"op": "remove", "product_id": _product_id(ctx)}],
+    })),
+}
+
+# logout نشست کلاینت را از بین می‌برد و معنای بنچمارک ندارد
+SKIPPED = {"logout"}
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return round(values[index], 2)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "اجرای هم‌زمان همه routeهای auth_app/url.py و گزارش p50/p95/p99، throughput و تعداد کوئری‌ها"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routes", nargs="+", help="نام routeها (پیش‌فرض: همه)")
+        parser.add_argument("--requests", type=int, default=200, help="تعداد درخواست برای هر route")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--host", default="localhost", help="مقدار Host درخواست‌ها (باید در ALLOWED_HOSTS باشد)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="ذخیره نتیجه به صورت JSON")
+
+    def handle(self, *args, **options):
+        names = [p.name for p in urlpatterns if p.name not in SKIPPED]
+        routes = options["routes"] or names
+        unknown = set(routes) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"سناریویی برای این routeها تعریف نشده: {', '.join(sorted(unknown))}")
+
+        product_ids = list(Product.objects.values_list("id", flat=True)[:10_000])
+        users = list(User.objects.filter(is_staff=False).order_by("id")[:options["concurrency"]])
+        if not product_ids or len(users) < options["concurrency"]:
+            raise CommandError("داده کافی نیست؛ اول manage.py seed_data را اجرا کنید.")
+        staff, _ = User.objects.get_or_create(username="bench_admin", defaults={"is_staff": True})
+
+        results = {}
+        for name in routes:
+            results[name] = self.run_route(name, options, product_ids, users, staff)
+            summary = results[name]
+            self.stdout.write(
+                f"{name:<18} {summary['throughput_rps']:>8} req/s  "
+                f"p50={summary['latency_ms']['p50']}ms p95={summary['latency_ms']['p95']}ms "
+                f"p99={summary['latency_ms']['p99']}ms  queries={summary['queries']['mean']}"
+            )
+
+        report = {
+            "commit": git_commit(),
+            "vendor": connection.vendor,
+            "dataset": {
+                "products": Product.objects.count(),
+                "users": User.objects.count(),
+                "orders": Order.objects.count(),
+                "order_items": OrderItem.objects.count(),
+            },
+            "requests_per_route": options["requests"],
+            "concurrency": options["concurrency"],
+            "routes": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"نتیجه در {options['output']} ذخیره شد.")
+
+    def run_route(self, name, options, product_ids, users, staff):
+        needs_login, build = SCENARIOS[name]
+        concurrency = options["concurrency"]
+        per_worker = [options["requests"] // concurrency] * concurrency
+        for i in range(options["requests"] % concurrency):
+            per_worker[i] += 1
+
+        latencies, query_counts, errors = [], [], []
+        lock = threading.Lock()
+
+        def worker(index):
+            user = staff if name == "add_product" else users[index]
+            ctx = {"rng": random.Random(options["seed"] + index), "product_ids": product_ids, "user": user}
+            client = Client(HTTP_HOST=options["host"])
+            if needs_login:
+                client.force_login(user)
+
+            local_latencies, local_queries, local_errors = [], [], 0
+            try:
+                for _ in range(per_worker[index]):
+                    method, url, data = build(client, ctx)
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        try:
+                            if method == "post":
+                                response = client.post(url, data=json.dumps(data), content_type="application/json")
+                            else:
+                                response = client.get(url)
+                            failed = response.status_code >= 400
+                        except Exception:  # noqa: BLE001 - خطای view هم در گزارش شمرده می‌شود
+                            failed = True
+                        elapsed = (time.perf_counter() - started) * 1000
+                    local_errors += failed
+                    local_latencies.append(elapsed)
+                    local_queries.append(len(queries.captured_queries))
+            finally:
+                if concurrency > 1:
+                    connection.close()
+
+            with lock:
+                latencies.extend(local_latencies)
+                query_counts.extend(local_queries)
+                errors.append(local_errors)
+
+        started = time.monotonic()
+        if concurrency == 1:
+            worker(0)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(worker, range(concurrency)))
+        wall = time.monotonic() - started
+
+        return {
+            "requests": len(latencies),
+            "errors": sum(errors),
+            "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+            "latency_ms": {
+                "mean": round(statistics.fmean(latencies), 2) if latencies else None,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            },
+            "queries": {
+                "mean": round(statistics.fmean(query_counts), 1) if query_counts else None,
+                "max": max(query_counts, default=None),
+            },
+        }
@@ -0,0 +1,136 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+import auth_app
+
+
+APP_DIR = Path(auth_app.__file__).resolve().parent
+
+VENDOR_CSS = APP_DIR / "assets" / "vendor" / "bootstrap.min.css"
+STYLE_CSS = APP_DIR / "static" / "css" / "style.css"
+OUTPUT_CSS = APP_DIR / "static" / "css" / "site.css"
+
+TEMPLATE_CLASS_RE = re.compile(r'\bclass="([^"]*)"')
+PYTHON_CLASS_RE = re.compile(r'["\']class["\']\s*:\s*["\']([^"\']*)["\']')
+TEMPLATE_TAG_RE = re.compile(r"{%.*?%}|{{.*?}}")
+SELECTOR_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+LICENSE_RE = re.compile(r"/\*!.*?\*/", re.S)
+
+# کلاس‌هایی که در قالب‌ها به صورت پویا ساخته می‌شوند
+DYNAMIC_PREFIXES = {"alert-": lambda: settings.MESSAGE_TAGS.values()}
+
+
+def used_classes():
+    classes = set()
+    for path in (APP_DIR / "templates").rglob("*.html"):
+        text = path.read_text(encoding="utf-8")
+        for value in TEMPLATE_CLASS_RE.findall(text):
+            classes.update(TEMPLATE_TAG_RE.sub(" ", value).split())
+    for path in APP_DIR.glob("*.py"):
+        for value in PYTHON_CLASS_RE.findall(path.read_text(encoding="utf-8")):
+            classes.update(value.split())
+    for prefix, values in DYNAMIC_PREFIXES.items():
+        classes.update(prefix + value for value in values())
+    return classes
+
+
+def split_blocks(css):
+    """
+    CSS فشرده را به لیست (prelude, body) تقسیم می‌کند؛ body برای at-ruleهای تودرتو
+    خودش دوباره تقسیم می‌شود. رشته‌ها و کامنت‌ها رد می‌شوند.
+    """
+    blocks, depth, start, body_start, prelude, i = [], 0, 0, 0, "", 0
+    while i < len(css):
+        char = css[i]
+        if char in "\"'":
+            i = css.index(char, i + 1)
+        elif css.startswith("/*", i):
+            i = css.index("*/", i) + 1
+        elif char == "{":
+            if depth == 0:
+                prelude, body_start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[body_start:i]))
+                start = i + 1
+        elif char == ";" and depth == 0:
+            # at-rule بدون بدنه، مثل @charset
+            blocks.append((css[start:i].strip(), None))
+            start = i + 1
+        i += 1
+    return blocks
+
+
+def split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for i, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return [s.strip() for s in selectors]
+
+
+def keep_selector(selector, classes):
+    # تم تیره در این سایت استفاده نمی‌شود
+    if "data-bs-theme=dark" in selector:
+        return False
+    return set(SELECTOR_CLASS_RE.findall(selector)) <= classes
+
+
+def trim(css, classes):
+    out = []
+    for prelude, body in split_blocks(LICENSE_RE.sub("", css)):
+        if body is None:
+            continue
+        if prelude.startswith(("@media", "@supports", "@container", "@layer")):
+            inner = trim(body, classes)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            # @keyframes و مشابه‌ها بعد از بقیه بررسی می‌شوند
+            out.append((prelude, body))
+        else:
+            selectors = [s for s in split_selectors(prelude) if keep_selector(s, classes)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+
+    rules = "".join(part for part in out if isinstance(part, str))
+    for part in out:
+        if isinstance(part, tuple):
+            prelude, body = part
+            name = prelude.split(None, 1)[-1]
+            if not prelude.startswith("@keyframes") or name in rules:
+                rules += f"{prelude}{{{body}}}"
+    return rules
+
+
+class Command(BaseCommand):
+    help = (
+        "ساخت static/css/site.css از بوت‌استرپ vendorشده (فقط کلاس‌هایی که قالب‌ها و فرم‌ها "
+        "استفاده می‌کنند) و css/style.css"
+    )
+
+    def handle(self, *args, **options):
+        vendor = VENDOR_CSS.read_text(encoding="utf-8")
+        license_comment = LICENSE_RE.search(vendor).group(0)
+        classes = used_classes()
+        trimmed = trim(vendor, classes)
+
+        OUTPUT_CSS.write_text(
+            "/* generated by manage.py build_css; edit css/style.css instead */\n"
+            f"{license_comment}\n{trimmed}\n\n{STYLE_CSS.read_text(encoding='utf-8')}",
+            encoding="utf-8",
+        )
+        self.stdout.write(
+            f"{len(classes)} کلاس؛ بوت‌استرپ از {len(vendor):,} به {len(trimmed):,} بایت رسید -> {OUTPUT_CSS}"
+        )
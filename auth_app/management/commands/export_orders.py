@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError, OutputWrapper
+
+from auth_app.exports import EXPORT_CHUNK_SIZE, FORMATS, filter_orders, iter_orders, parse_moment
+from auth_app.models import Order
+
+
+class Command(BaseCommand):
+    help = "خروجی جریانی سفارش‌ها همراه با اقلام، به صورت CSV یا JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument(
+            "--status", action="append", choices=[status for status, _ in Order.STATUS_CHOICES],
+            help="قابل تکرار؛ پیش‌فرض همه وضعیت‌ها",
+        )
+        parser.add_argument("--since", help="از این تاریخ (ISO، شامل)")
+        parser.add_argument("--until", help="تا این تاریخ (ISO، شامل کل روز)")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--output", help="مسیر فایل خروجی (پیش‌فرض stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_moment(options["since"]) if options["since"] else None
+            until = parse_moment(options["until"], end=True) if options["until"] else None
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        orders = filter_orders(statuses=options["status"], since=since, until=until)
+        lines, _ = FORMATS[options["format"]]
+
+        fh = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else None
+        out = OutputWrapper(fh) if fh else self.stdout
+        count = 0
+        try:
+            for line in lines(iter_orders(orders, chunk_size=options["chunk_size"])):
+                out.write(line, ending="")
+                count += 1
+        finally:
+            if fh:
+                fh.close()
+
+        if options["output"]:
+            self.stderr.write(f"{count} سطر در {options['output']} نوشته شد.")
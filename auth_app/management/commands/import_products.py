@@ -0,0 +1,131 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from auth_app import catalog
+from auth_app.models import Product
+
+
+FIELDS = ("sku", "name", "description", "price", "stock")
+
+UPDATE_FIELDS = ["name", "description", "price", "stock"]
+
+
+def read_jsonl(fh):
+    for line in fh:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # سطر خراب هم مثل ردیف نامعتبر رد می‌شود، نه اینکه کل import متوقف شود
+        yield row if isinstance(row, dict) else {"__error__": "JSON نامعتبر"}
+
+
+READERS = {"csv": csv.DictReader, "jsonl": read_jsonl}
+
+
+def build_product(row):
+    """
+    ردیف خام را به Product تبدیل و اعتبارسنجی می‌کند؛ در صورت خطا ValidationError.
+    """
+    if "__error__" in row:
+        raise ValidationError(row["__error__"])
+
+    values = {field: row.get(field) for field in FIELDS}
+    for field, value in values.items():
+        if isinstance(value, str):
+            values[field] = value.strip()
+    if not values["sku"]:
+        raise ValidationError("sku الزامی است.")
+    if values["stock"] == "":
+        values["stock"] = None
+
+    product = Product(**values)
+    # unique بودن sku را upsert تضمین می‌کند؛ بررسی آن برای هر ردیف یک کوئری اضافه بود
+    product.full_clean(validate_unique=False, validate_constraints=False)
+    return product
+
+
+class Command(BaseCommand):
+    help = (
+        "import محصولات از CSV یا JSONL به صورت جریانی؛ محصولات با sku موجود "
+        "به‌روزرسانی و بقیه ساخته می‌شوند"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="مسیر فایل یا - برای stdin")
+        parser.add_argument("--format", choices=sorted(READERS), help="پیش‌فرض: از پسوند فایل")
+        parser.add_argument("--batch-size", type=int, default=2_000)
+        parser.add_argument("--rejects", help="ذخیره ردیف‌های ردشده با دلیل، به صورت JSONL")
+        parser.add_argument("--dry-run", action="store_true", help="فقط اعتبارسنجی، بدون نوشتن در دیتابیس")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if fmt not in READERS:
+            raise CommandError("فرمت فایل مشخص نیست؛ --format را بدهید.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size باید مثبت باشد.")
+
+        fh = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        rejects = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+        try:
+            imported, rejected, elapsed = self.run(READERS[fmt](fh), options, rejects)
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+            if rejects:
+                rejects.close()
+
+        if imported and not options["dry_run"]:
+            # bulk_create سیگنال post_save نمی‌فرستد
+            catalog.invalidate()
+
+        rate = imported / elapsed if elapsed else imported
+        self.stdout.write(
+            f"{imported} محصول در {elapsed:.1f} ثانیه ({rate:,.0f} ردیف/ثانیه)، {rejected} ردیف رد شد."
+        )
+
+    def run(self, rows, options, rejects):
+        started = time.monotonic()
+        imported = rejected = 0
+        # در یک batch هر sku فقط یک بار؛ ON CONFLICT نمی‌تواند یک ردیف را دو بار به‌روز کند
+        batch = {}
+
+        for number, row in enumerate(rows, start=1):
+            try:
+                product = build_product(row)
+            except ValidationError as exc:
+                rejected += 1
+                if rejects:
+                    reason = "; ".join(exc.messages)
+                    rejects.write(json.dumps({"record": number, "error": reason, "row": row}, ensure_ascii=False) + "\n")
+                continue
+
+            imported += 1
+            batch[product.sku] = product
+            if len(batch) >= options["batch_size"]:
+                self.flush(batch, options["dry_run"])
+
+        self.flush(batch, options["dry_run"])
+        return imported, rejected, time.monotonic() - started
+
+    def flush(self, batch, dry_run):
+        if batch and not dry_run:
+            with transaction.atomic():
+                Product.objects.bulk_create(
+                    batch.values(),
+                    update_conflicts=True,
+                    unique_fields=["sku"],
+                    update_fields=UPDATE_FIELDS,
+                )
+        batch.clear()
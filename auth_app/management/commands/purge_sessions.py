@@ -0,0 +1,40 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "حذف sessionهای منقضی در batchهای کوچک تا جدول قفل طولانی نگیرد؛ "
+        "برای اجرای زمان‌بندی‌شده (مثلاً cron هر ساعت)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5_000, help="تعداد session در هر DELETE")
+        parser.add_argument("--sleep", type=float, default=0.1, help="مکث بین batchها (ثانیه)")
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, "get_model_class"):
+            self.stdout.write(f"{settings.SESSION_ENGINE} در دیتابیس ذخیره نمی‌شود؛ چیزی برای حذف نیست.")
+            return
+
+        expired = store.get_model_class().objects.filter(expire_date__lt=timezone.now())
+        started = time.monotonic()
+        total = 0
+        while True:
+            keys = list(expired.values_list("pk", flat=True)[: options["batch_size"]])
+            if not keys:
+                break
+            deleted, _ = expired.filter(pk__in=keys).delete()
+            total += deleted
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{total} session حذف شد")
+            if len(keys) < options["batch_size"]:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(f"{total} session منقضی در {time.monotonic() - started:.1f} ثانیه حذف شد.")
@@ -0,0 +1,56 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from auth_app import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "اجرای کارهای صف پس‌زمینه؛ برای مقیاس افقی چند worker هم‌زمان اجرا کنید. "
+        "با SIGTERM/Ctrl+C کار فعلی تمام می‌شود و بعد خارج می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10, help="تعداد کاری که هر بار برداشته می‌شود")
+        parser.add_argument("--poll", type=float, default=1.0, help="مکث وقتی صف خالی است (ثانیه)")
+        parser.add_argument("--once", action="store_true", help="کارهای آماده را اجرا کن و خارج شو")
+        parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        done = failed = 0
+        last_requeue = 0
+        while not self.stopping:
+            # اتصال‌های قدیمی یا خراب (CONN_MAX_AGE) مثل ابتدای هر درخواست بسته می‌شوند
+            close_old_connections()
+            if time.monotonic() - last_requeue > 60:
+                jobs.requeue_stale()
+                last_requeue = time.monotonic()
+
+            claimed = jobs.claim(options["worker_id"], options["batch_size"])
+            for index, job in enumerate(claimed):
+                if self.stopping:
+                    jobs.release(claimed[index:])
+                    break
+                if jobs.run(job):
+                    done += 1
+                else:
+                    failed += 1
+            if not claimed:
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+
+        self.stdout.write(f"{done} کار انجام شد، {failed} کار ناموفق بود.")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,146 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from auth_app import catalog, sales
+from auth_app.models import Order, OrderItem, Product
+
+
+WORDS = [
+    "گوشی", "لپ‌تاپ", "کیف", "کتاب", "هدفون", "ساعت", "کفش", "دوربین", "میز", "چراغ",
+    "phone", "laptop", "bag", "book", "headphone", "watch", "shoe", "camera", "desk", "lamp",
+    "pro", "mini", "max", "lite", "plus", "هوشمند", "بی‌سیم", "چرمی", "فلزی", "جدید",
+]
+
+STATUSES = [status for status, _ in Order.STATUS_CHOICES]
+
+
+@contextmanager
+def manual_created_at():
+    # created_at با auto_now_add همیشه «الان» می‌شود؛ برای داده ساختگی تاریخ‌ها پخش می‌شوند
+    field = Order._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "ساخت داده ساختگی (محصول، کاربر، سفارش) با bulk insert برای تست بار"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=50_000)
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--order-items", type=int, default=1_000_000)
+        parser.add_argument("--items-per-order", type=int, default=5)
+        parser.add_argument("--days", type=int, default=365, help="بازه پخش تاریخ سفارش‌ها")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--prefix", default="seed", help="پیشوند نام کاربری‌ها")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        product_ids = self.seed_products(options["products"])
+        user_ids = self.seed_users(options["users"], options["prefix"])
+        if product_ids and user_ids:
+            self.seed_orders(
+                options["order_items"], options["items_per_order"], options["days"], product_ids, user_ids,
+            )
+            # سفارش‌ها با bulk_create ساخته شدند و جمع فروش روزانه باید از نو ساخته شود
+            for _ in sales.rebuild():
+                pass
+
+        catalog.invalidate()
+
+    def report(self, label, count, started):
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(f"{label}: {count} ردیف در {elapsed:.1f} ثانیه ({rate:,.0f} ردیف/ثانیه)")
+
+    def insert(self, model, rows):
+        with transaction.atomic():
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def seed_products(self, count):
+        started = time.monotonic()
+        first_id = (Product.objects.order_by("-id").values_list("id", flat=True).first() or 0)
+
+        for start in range(0, count, self.batch_size):
+            rows = []
+            for _ in range(min(self.batch_size, count - start)):
+                words = self.rng.sample(WORDS, 3)
+                rows.append(Product(
+                    name=" ".join(words)[:100],
+                    description=" ".join(self.rng.choices(WORDS, k=12)),
+                    price=self.rng.randrange(10, 50_000) * 1000,
+                    stock=self.rng.choice([None, self.rng.randrange(0, 500)]),
+                ))
+            self.insert(Product, rows)
+
+        self.report("محصولات", count, started)
+        return list(Product.objects.filter(id__gt=first_id).values_list("id", flat=True))
+
+    def seed_users(self, count, prefix):
+        started = time.monotonic()
+        # هش رمز فقط یک بار محاسبه می‌شود؛ PBKDF2 برای هر کاربر چند دقیقه طول می‌کشید
+        password = make_password("password")
+        first_id = (User.objects.order_by("-id").values_list("id", flat=True).first() or 0)
+        offset = User.objects.filter(username__startswith=prefix).count()
+
+        for start in range(0, count, self.batch_size):
+            rows = [
+                User(
+                    username=f"{prefix}{offset + n}",
+                    email=f"{prefix}{offset + n}@example.com",
+                    password=password,
+                )
+                for n in range(start, min(start + self.batch_size, count))
+            ]
+            self.insert(User, rows)
+
+        self.report("کاربران", count, started)
+        return list(User.objects.filter(id__gt=first_id).values_list("id", flat=True))
+
+    def seed_orders(self, item_count, items_per_order, days, product_ids, user_ids):
+        started = time.monotonic()
+        prices = dict(Product.objects.filter(id__in=product_ids).values_list("id", "price"))
+        now = timezone.now()
+        order_count = max(item_count // items_per_order, 1)
+        orders_per_batch = max(self.batch_size // items_per_order, 1)
+
+        created_items = 0
+        with manual_created_at():
+            for start in range(0, order_count, orders_per_batch):
+                orders, lines = [], []
+                for _ in range(min(orders_per_batch, order_count - start)):
+                    chosen = self.rng.sample(product_ids, min(items_per_order, len(product_ids)))
+                    order_lines = [(pid, self.rng.randint(1, 3)) for pid in chosen]
+                    orders.append(Order(
+                        user_id=self.rng.choice(user_ids),
+                        status=self.rng.choice(STATUSES),
+                        created_at=now - timedelta(seconds=self.rng.randrange(days * 86_400)),
+                        total=sum(prices[pid] * qty for pid, qty in order_lines),
+                    ))
+                    lines.append(order_lines)
+
+                with transaction.atomic():
+                    Order.objects.bulk_create(orders, batch_size=self.batch_size)
+                    items = [
+                        OrderItem(order=order, product_id=pid, quantity=qty, price=prices[pid])
+                        for order, order_lines in zip(orders, lines)
+                        for pid, qty in order_lines
+                    ]
+                    OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                created_items += len(items)
+
+        self.report("اقلام سفارش", created_items, started)
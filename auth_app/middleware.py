@@ -0,0 +1,120 @@
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("auth_app.timing")
+
+
+class QueryStats:
+    """
+    تعداد و زمان کوئری‌های یک درخواست که execute_wrapper جمع می‌کند.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            # کوئری‌ها پارامتری‌اند؛ متن یکسان یعنی همان کوئری با مقدار دیگر (N+1)
+            self.statements[sql] += 1
+
+    def install(self, stack):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+
+    def repeated(self, limit):
+        return [(sql, n) for sql, n in self.statements.most_common(limit) if n > 1]
+
+
+class RequestTimingMiddleware:
+    """
+    زمان کل درخواست، تعداد و زمان کوئری‌ها را در هدر Server-Timing می‌گذارد
+    و درخواست‌های کند را همراه با کوئری‌های تکراری لاگ می‌کند. هدر فقط در DEBUG
+    یا برای کاربران staff فرستاده می‌شود تا زمان‌بندی داخلی به بقیه نشان داده نشود.
+
+    با REQUEST_TIMING_SAMPLE_RATE فقط بخشی از درخواست‌ها اندازه‌گیری می‌شوند؛
+    بقیه بدون هیچ هزینه‌ای از middleware رد می‌شوند.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            stats.install(stack)
+            response = self.get_response(request)
+        self.finish(request, response, stats, started, self.show_header(getattr(request, "user", None)))
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        # ORM در async از طریق sync_to_async(thread_sensitive=True) و روی یک thread
+        # ثابت برای هر درخواست اجرا می‌شود؛ wrapper هم باید روی اتصال همان thread نصب شود
+        stats = QueryStats()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(stats.install)(stack)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        user = await request.auser() if hasattr(request, "auser") else None
+        self.finish(request, response, stats, started, self.show_header(user))
+        return response
+
+    def show_header(self, user):
+        return settings.DEBUG or (user is not None and user.is_staff)
+
+    def finish(self, request, response, stats, started, show_header):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = stats.duration * 1000
+        if show_header:
+            response["Server-Timing"] = (
+                f'app;dur={total_ms:.1f}, db;dur={db_ms:.1f};desc="{stats.count} queries"'
+            )
+
+        if total_ms >= settings.SLOW_REQUEST_MS:
+            repeated = stats.repeated(settings.SLOW_REQUEST_TOP_QUERIES)
+            logger.warning(
+                "slow request %s %s: %.1fms, %d queries in %.1fms%s",
+                request.method,
+                request.get_full_path(),
+                total_ms,
+                stats.count,
+                db_ms,
+                "".join(f"\n  {n}x {sql}" for sql, n in repeated),
+                extra={"status_code": response.status_code, "request": request},
+            )
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+SQLITE_NORMALIZE = "replace(replace(replace({}, 'ي', 'ی'), 'ك', 'ک'), char(8204), ' ')"
+
+POSTGRES_NORMALIZE = "replace(replace(replace(coalesce({}, ''), 'ي', 'ی'), 'ك', 'ک'), chr(8204), ' ')"
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, " + POSTGRES_NORMALIZE.format("name") + "), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, " + POSTGRES_NORMALIZE.format("description") + "), 'B')"
+)
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE auth_app_product_fts
+        USING fts5(name, description, tokenize = 'unicode61 remove_diacritics 2')""",
+    f"""INSERT INTO auth_app_product_fts (rowid, name, description)
+        SELECT id, {SQLITE_NORMALIZE.format("name")}, {SQLITE_NORMALIZE.format("description")}
+        FROM auth_app_product""",
+    f"""CREATE TRIGGER auth_app_product_fts_insert AFTER INSERT ON auth_app_product BEGIN
+        INSERT INTO auth_app_product_fts (rowid, name, description)
+        VALUES (new.id, {SQLITE_NORMALIZE.format("new.name")}, {SQLITE_NORMALIZE.format("new.description")});
+    END""",
+    """CREATE TRIGGER auth_app_product_fts_delete AFTER DELETE ON auth_app_product BEGIN
+        DELETE FROM auth_app_product_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER auth_app_product_fts_update AFTER UPDATE OF name, description ON auth_app_product BEGIN
+        DELETE FROM auth_app_product_fts WHERE rowid = old.id;
+        INSERT INTO auth_app_product_fts (rowid, name, description)
+        VALUES (new.id, {SQLITE_NORMALIZE.format("new.name")}, {SQLITE_NORMALIZE.format("new.description")});
+    END""",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS auth_app_product_fts_update",
+    "DROP TRIGGER IF EXISTS auth_app_product_fts_delete",
+    "DROP TRIGGER IF EXISTS auth_app_product_fts_insert",
+    "DROP TABLE IF EXISTS auth_app_product_fts",
+]
+
+POSTGRES_FORWARD = [
+    f"CREATE INDEX product_search_gin_idx ON auth_app_product USING GIN (({POSTGRES_VECTOR}))",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS product_search_gin_idx",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0005_product_price_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run_for_vendor({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
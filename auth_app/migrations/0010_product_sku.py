@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:27
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+search_index = import_module("auth_app.migrations.0006_product_search_index")
+
+# SQLite برای افزودن ستون unique جدول را از نو می‌سازد و تریگرهای FTS همراه
+# جدول قدیمی پاک می‌شوند؛ قبل از تغییر برداشته و بعد از آن دوباره ساخته می‌شوند
+SQLITE_TRIGGERS = [statement for statement in search_index.SQLITE_FORWARD if "CREATE TRIGGER" in statement]
+
+SQLITE_DROP_TRIGGERS = [statement for statement in search_index.SQLITE_REVERSE if "DROP TRIGGER" in statement]
+
+drop_triggers = search_index.run_for_vendor({"sqlite": SQLITE_DROP_TRIGGERS})
+
+create_triggers = search_index.run_for_vendor({"sqlite": SQLITE_TRIGGERS})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0009_product_stock'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_triggers, create_triggers),
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0010_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='auth_app.product')),
+            ],
+            options={
+                'verbose_name': 'فروش روزانه',
+                'verbose_name_plural': 'فروش روزانه',
+                'constraints': [models.UniqueConstraint(fields=('day', 'product'), name='unique_daily_sales_day_product')],
+            },
+        ),
+    ]
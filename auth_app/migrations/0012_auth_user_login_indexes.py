@@ -0,0 +1,52 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Upper
+
+
+# عبارت‌ها باید دقیقا همان‌هایی باشند که auth_app.backends در WHERE می‌سازد
+FORWARD = [
+    "CREATE INDEX auth_user_username_upper_idx ON auth_user (UPPER(username))",
+    "CREATE UNIQUE INDEX auth_user_email_upper_uniq ON auth_user (NULLIF(UPPER(email), ''))",
+]
+
+REVERSE = [
+    "DROP INDEX IF EXISTS auth_user_email_upper_uniq",
+    "DROP INDEX IF EXISTS auth_user_username_upper_idx",
+]
+
+
+def check_duplicate_emails(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    duplicates = list(
+        User.objects.exclude(email="")
+        .values(key=Upper("email"))
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("key", flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "این ایمیل‌ها برای بیش از یک کاربر ثبت شده‌اند و باید قبل از این مایگریشن "
+            f"اصلاح شوند: {', '.join(duplicates)}"
+        )
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+            for statement in statements:
+                schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('auth_app', '0011_dailysales'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunPython(run(FORWARD), run(REVERSE)),
+    ]
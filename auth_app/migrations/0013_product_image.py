@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:44
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+# مثل 0010: بازسازی جدول در SQLite تریگرهای FTS را پاک می‌کند
+product_sku = import_module("auth_app.migrations.0010_product_sku")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0012_auth_user_login_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(product_sku.drop_triggers, product_sku.create_triggers),
+        migrations.AddField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='products/originals/'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(product_sku.create_triggers, product_sku.drop_triggers),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:15
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_current_prices(apps, schema_editor):
+    # سبدهای موجود قیمت زمان افزودن ندارند؛ قیمت فعلی محصول جای آن می‌نشیند
+    CartLine = apps.get_model("auth_app", "CartLine")
+    Product = apps.get_model("auth_app", "Product")
+    CartLine.objects.update(price=Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0015_order_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartline',
+            name='price',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(snapshot_current_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from importlib import import_module
+
+from django.db import migrations
+
+
+search_index = import_module("auth_app.migrations.0006_product_search_index")
+
+# ts_rank روی ایندکس عبارتی 0006 باید to_tsvector را برای هر ردیف دوباره حساب کند؛
+# ستون generated بردار را یک بار موقع نوشتن می‌سازد و هم ایندکس و هم رتبه‌بندی از آن می‌خوانند
+POSTGRES_FORWARD = [
+    f"""ALTER TABLE auth_app_product ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS ({search_index.POSTGRES_VECTOR}) STORED""",
+    "CREATE INDEX product_search_vector_idx ON auth_app_product USING GIN (search_vector)",
+    "DROP INDEX IF EXISTS product_search_gin_idx",
+]
+
+POSTGRES_REVERSE = [
+    *search_index.POSTGRES_FORWARD,
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "ALTER TABLE auth_app_product DROP COLUMN IF EXISTS search_vector",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0017_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            search_index.run_for_vendor({"postgresql": POSTGRES_FORWARD}),
+            search_index.run_for_vendor({"postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
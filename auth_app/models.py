@@ -1,15 +1,92 @@
-from django.db import models
+from django.db import connection, models
+from django.utils import timezone
 from django.conf import settings
+from django.core.files.storage import default_storage
+
+
+class ProductManager(models.Manager):
+    def reserve_stock(self, quantities):
+        """
+        موجودی محصولات {product_id: quantity} را به صورت اتمیک کم می‌کند؛ فقط
+        ردیف‌هایی که موجودی کافی دارند کم می‌شوند (بدون خواندن و نوشتن جداگانه).
+        خروجی: {product_id: موجودی باقی‌مانده} برای ردیف‌های رزروشده.
+        """
+        if not quantities:
+            return {}
+
+        if connection.vendor not in ("sqlite", "postgresql"):
+            reserved = {}
+            for product_id, quantity in quantities.items():
+                rows = self.filter(pk=product_id, stock__gte=quantity).update(stock=models.F("stock") - quantity)
+                if rows:
+                    reserved[product_id] = self.filter(pk=product_id).values_list("stock", flat=True).first()
+            return reserved
+
+        # یک UPDATE ... RETURNING برای همه ردیف‌ها، تا تعداد کوئری‌ها به تعداد
+        # ردیف‌های سبد بستگی نداشته باشد
+        table = self.model._meta.db_table
+        cases, conditions, case_params, where_params = [], [], [], []
+        for product_id, quantity in quantities.items():
+            cases.append("WHEN %s THEN CAST(%s AS INTEGER)")
+            case_params += [product_id, quantity]
+            conditions.append("(id = %s AND stock >= %s)")
+            where_params += [product_id, quantity]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET stock = stock - (CASE id {' '.join(cases)} END) "
+                f"WHERE {' OR '.join(conditions)} RETURNING id, stock",
+                case_params + where_params,
+            )
+            return dict(cursor.fetchall())
 
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)  # کد کالا در فید تامین‌کننده
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.IntegerField()
+    stock = models.PositiveIntegerField(null=True, blank=True)  # خالی یعنی موجودی کنترل نمی‌شود
+    image = models.ImageField(upload_to="products/originals/", blank=True)
+    # {"source": نام فایل اصلی، "width"/"height": ابعاد، "webp"/"jpeg": {عرض: نام فایل}}؛ auth_app.images پر می‌کند
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["price", "id"], name="product_price_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def in_stock(self):
+        return self.stock is None or self.stock > 0
+
+    def _srcset(self, fmt):
+        widths = self.thumbnails.get(fmt, {})
+        return ", ".join(f"{default_storage.url(name)} {width}w" for width, name in widths.items())
+
+    @property
+    def webp_srcset(self):
+        return self._srcset("webp")
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset("jpeg")
+
+    @property
+    def thumbnail_url(self):
+        """
+        کوچک‌ترین نسخه JPEG؛ برای مرورگرهایی که srcset ندارند و برای API.
+        """
+        widths = self.thumbnails.get("jpeg")
+        if not widths:
+            return None
+        return default_storage.url(widths[min(widths, key=int)])
+
 
 class Order(models.Model):
     STATUS_CHOICES = (
@@ -18,16 +95,39 @@ class Order(models.Model):
         ("cancelled", "لغو شده"),
     )
 
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders")
+    # ایندکس جدای user لازم نیست؛ order_user_created_idx با user شروع می‌شود
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders", db_index=False,
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
+    total = models.PositiveIntegerField(default=0)  # جمع کل زمان ثبت سفارش
+
+    class Meta:
+        # هر کوئری اصلی سفارش‌ها یک ایندکس دارد؛ QueryPlanTests در tests.py این را بررسی می‌کند
+        indexes = [
+            # تاریخچه سفارش‌های هر کاربر، جدیدترین اول، با صفحه‌بندی keyset روی (created_at, id)
+            models.Index(fields=["user", "created_at", "id"], name="order_user_created_idx"),
+            # فیلتر وضعیت در ادمین و خروجی‌ها، مرتب یا محدود به تاریخ
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+            # فیلتر و مرتب‌سازی تاریخ بدون وضعیت (ادمین، export_orders --since/--until)
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user}"
 
     @property
     def total_price(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.total
+
+    def recalculate_total(self, save=True):
+        self.total = self.items.aggregate(
+            total=models.Sum(models.F("price") * models.F("quantity"), default=0)
+        )["total"]
+        if save:
+            Order.objects.filter(pk=self.pk).update(total=self.total)
+        return self.total
 
 
 class OrderItem(models.Model):
@@ -42,3 +142,86 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product} x {self.quantity}"
+
+
+class Cart(models.Model):
+    # کلید اصلی همان کاربر است تا برای پیدا کردن سبد کوئری اضافه لازم نباشد
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="cart")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cart - {self.user}"
+
+
+class CartLine(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="lines")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.IntegerField(default=0)  # قیمت زمان افزودن، برای خلاصه سبد بدون خواندن محصول
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="unique_cart_product"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity}"
+
+
+class DailySales(models.Model):
+    """
+    جمع فروش هر محصول در هر روز؛ با ثبت و تغییر وضعیت سفارش به صورت افزایشی به‌روز می‌شود
+    (auth_app.sales) تا گزارش‌ها جدول اقلام سفارش را پیمایش نکنند.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_sales")
+    units = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)
+    orders = models.IntegerField(default=0)  # تعداد اقلام سفارش (هر سفارش برای هر محصول یک قلم دارد)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="unique_daily_sales_day_product"),
+        ]
+        verbose_name = "فروش روزانه"
+        verbose_name_plural = "فروش روزانه"
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id}"
+
+
+class Job(models.Model):
+    """
+    کار پس‌زمینه در صف دیتابیسی (auth_app.jobs)؛ کارهای موفق حذف می‌شوند و فقط
+    کارهای در صف، در حال اجرا و شکست‌خورده می‌مانند.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "در صف"),
+        (RUNNING, "در حال اجرا"),
+        (FAILED, "شکست خورده"),
+    )
+
+    name = models.CharField(max_length=200)  # نام task ثبت‌شده با jobs.task
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # worker فقط کارهای در صف را به ترتیب run_at می‌خواند
+            models.Index(fields=["run_at"], condition=models.Q(status="queued"), name="job_queued_run_at_idx"),
+        ]
+        verbose_name = "کار پس‌زمینه"
+        verbose_name_plural = "کارهای پس‌زمینه"
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
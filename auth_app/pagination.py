@@ -0,0 +1,146 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _field_names(ordering):
+    return [field.lstrip("-") for field in ordering]
+
+
+def encode_cursor(obj, ordering):
+    values = []
+    for name in _field_names(ordering):
+        value = getattr(obj, name)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        values.append(value)
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    کرسر را به مقادیر فیلدها برمی‌گرداند؛ اگر کرسر خراب باشد None برمی‌گردد.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+
+    names = _field_names(ordering)
+    if not isinstance(values, list) or len(values) != len(names):
+        return None
+
+    try:
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(names, values)]
+    except (ValidationError, TypeError):
+        return None
+
+
+def _seek_filter(ordering, values, forward=True):
+    """
+    شرط WHERE برای ردیف‌های بعد از کرسر: (a > x) OR (a = x AND b > y) ...
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        descending = field.startswith("-")
+        lookup = "lt" if descending == forward else "gt"
+
+        term = Q(**{f"{name}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            term &= Q(**{prev_field.lstrip("-"): prev_value})
+        condition |= term
+    return condition
+
+
+def _reverse_ordering(ordering):
+    return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+
+def _keyset_query(queryset, ordering, after, before, per_page):
+    """
+    کوئری صفحه (با یک ردیف اضافه برای فهمیدن صفحه بعد) و کرسرهای معتبر را می‌سازد.
+    """
+    model = queryset.model
+    after_values = decode_cursor(after, model, ordering) if after else None
+    before_values = decode_cursor(before, model, ordering) if before and after_values is None else None
+
+    if before_values is not None:
+        qs = queryset.filter(_seek_filter(ordering, before_values, forward=False))
+        return qs.order_by(*_reverse_ordering(ordering))[:per_page + 1], after_values, before_values
+
+    if after_values is not None:
+        queryset = queryset.filter(_seek_filter(ordering, after_values))
+    return queryset.order_by(*ordering)[:per_page + 1], after_values, before_values
+
+
+def _keyset_page(rows, ordering, after_values, before_values, per_page):
+    has_more = len(rows) > per_page
+
+    if before_values is not None:
+        rows = rows[:per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], ordering) if rows else None,
+            previous_cursor=encode_cursor(rows[0], ordering) if has_more else None,
+        )
+
+    rows = rows[:per_page]
+    previous_cursor = None
+    if after_values is not None and rows:
+        previous_cursor = encode_cursor(rows[0], ordering)
+
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], ordering) if has_more else None,
+        previous_cursor=previous_cursor,
+    )
+
+
+def paginate_keyset(queryset, ordering, after=None, before=None, per_page=None):
+    """
+    صفحه‌بندی keyset (بدون OFFSET). ordering باید یکتا باشد، پس فیلد آخر آن
+    معمولاً id است؛ مثلاً ("price", "id") یا ("-created_at", "-id").
+    """
+    ordering = list(ordering)
+    per_page = per_page or settings.PRODUCTS_PER_PAGE
+    qs, after_values, before_values = _keyset_query(queryset, ordering, after, before, per_page)
+    return _keyset_page(list(qs), ordering, after_values, before_values, per_page)
+
+
+async def apaginate_keyset(queryset, ordering, after=None, before=None, per_page=None):
+    """
+    نسخه async از paginate_keyset برای viewهای async.
+    """
+    ordering = list(ordering)
+    per_page = per_page or settings.PRODUCTS_PER_PAGE
+    qs, after_values, before_values = _keyset_query(queryset, ordering, after, before, per_page)
+    rows = [obj async for obj in qs]
+    return _keyset_page(rows, ordering, after_values, before_values, per_page)
@@ -0,0 +1,167 @@
+"""
+مسیریابی خواندن‌های کاتالوگ به replicaها.
+
+فقط viewهایی که با replica_reads علامت خورده‌اند (home، products، ProductDetail)
+مدل‌های DATABASE_REPLICA_MODELS را از replica می‌خوانند؛ بقیه کدها و همه نوشتن‌ها
+روی default می‌مانند. بعد از هر نوشتن، مرورگر با کوکی REPLICA_PIN_COOKIE تا
+REPLICA_PIN_SECONDS ثانیه به default سنجاق می‌شود تا تغییر خودش را (با وجود تاخیر
+replication) ببیند.
+
+برای امتحان محلی با دو فایل SQLite:
+
+    DATABASE_URL=sqlite:////tmp/shop.db python manage.py migrate
+    cp /tmp/shop.db /tmp/replica.db
+    DATABASE_URL=sqlite:////tmp/shop.db DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db python manage.py runserver
+"""
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+logger = logging.getLogger("auth_app.routers")
+
+_state = ContextVar("db_routing", default=None)
+_counter = itertools.count()
+# alias -> زمانی که دوباره امتحانش می‌کنیم
+_unhealthy = {}
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+
+
+def _healthy(alias):
+    retry_at = _unhealthy.get(alias)
+    if retry_at is not None and retry_at > time.monotonic():
+        return False
+    try:
+        # با CONN_MAX_AGE اتصال باز می‌ماند و این فقط یک بررسی سبک است
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning("replica %s is unavailable, reading from primary", alias)
+        _unhealthy[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    _unhealthy.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    """
+    replicaها را به نوبت امتحان می‌کند و اولین سالم را برمی‌گرداند؛ اگر هیچ‌کدام
+    در دسترس نباشد default.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    start = next(_counter)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if _healthy(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None
+            or not state.replica_reads
+            or state.pinned
+            or model._meta.label not in settings.DATABASE_REPLICA_MODELS
+            # داخل تراکنش باید همان چیزی را خواند که تراکنش می‌بیند
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicaها کپی default هستند
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def replica_reads(view):
+    """
+    خواندن‌های این view (اگر درخواست سنجاق نشده باشد) از replica انجام می‌شود.
+    """
+    def enable():
+        state = _state.get()
+        if state is not None:
+            state.replica_reads = True
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            enable()
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        enable()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaPinningMiddleware:
+    """
+    وضعیت مسیریابی هر درخواست را می‌سازد و اگر درخواست چیزی نوشت، کوکی سنجاق
+    به default را می‌گذارد.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        state = RoutingState(pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        return state, _state.set(state)
+
+    def finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, "1",
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax",
+            )
+        return response
@@ -0,0 +1,142 @@
+import datetime
+import zlib
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySales, Order, OrderItem
+
+
+# سفارش لغوشده از جمع فروش کم می‌شود و اگر دوباره فعال شود برمی‌گردد
+COUNTED_STATUSES = ("pending", "paid")
+
+# هر ردیف ۵ پارامتر دارد؛ زیر سقف پارامترهای SQLite می‌ماند
+UPSERT_BATCH_SIZE = 1_000
+
+# کلید اول advisory lockهای روزها در Postgres؛ کلید دوم شماره روز است
+DAY_LOCK_CLASS = zlib.crc32(b"auth_app.dailysales") & 0x7FFFFFFF
+
+
+def is_counted(status):
+    return status in COUNTED_STATUSES
+
+
+def order_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def add_rows(rows):
+    """
+    ردیف‌های (day, product_id, units, revenue, orders) را به جمع‌ها اضافه می‌کند؛
+    مقدار منفی یعنی کم کردن. همه ردیف‌ها در یک INSERT ... ON CONFLICT.
+    """
+    rows = [row for row in rows if any(row[2:])]
+    if not rows:
+        return
+    _lock_days(sorted({row[0] for row in rows}), shared=True)
+
+    if connection.vendor not in ("sqlite", "postgresql"):
+        for day, product_id, units, revenue, orders in rows:
+            updated = DailySales.objects.filter(day=day, product_id=product_id).update(
+                units=F("units") + units, revenue=F("revenue") + revenue, orders=F("orders") + orders,
+            )
+            if not updated:
+                DailySales.objects.create(day=day, product_id=product_id, units=units, revenue=revenue, orders=orders)
+        return
+
+    table = DailySales._meta.db_table
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            params = []
+            for day, product_id, units, revenue, orders in batch:
+                params += [connection.ops.adapt_datefield_value(day), product_id, units, revenue, orders]
+            cursor.execute(
+                f"INSERT INTO {table} (day, product_id, units, revenue, orders) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))} "
+                f"ON CONFLICT (day, product_id) DO UPDATE SET "
+                f"units = {table}.units + excluded.units, "
+                f"revenue = {table}.revenue + excluded.revenue, "
+                f"orders = {table}.orders + excluded.orders",
+                params,
+            )
+
+
+def _item_rows(day, signed_items):
+    totals = defaultdict(lambda: [0, 0, 0])
+    for item, sign in signed_items:
+        total = totals[item.product_id]
+        total[0] += sign * item.quantity
+        total[1] += sign * item.quantity * item.price
+        total[2] += sign
+    return [(day, product_id, *total) for product_id, total in totals.items()]
+
+
+def add_items(day, items, sign=1):
+    """
+    اقلام سفارش (OrderItem یا هر شیء با product_id، quantity و price) را در روز day ثبت می‌کند.
+    """
+    add_rows(_item_rows(day, [(item, sign) for item in items]))
+
+
+def replace_item(day, old, new):
+    add_rows(_item_rows(day, [(old, -1), (new, 1)]))
+
+
+def add_order(order, sign=1):
+    add_items(order_day(order), order.items.all(), sign)
+
+
+def _lock_days(days, shared=False):
+    """
+    در Postgres قفل روزها را تا پایان تراکنش می‌گیرد. تغییرهای افزایشی قفل
+    اشتراکی می‌گیرند و با هم تداخل ندارند؛ ساخت دوباره یک روز قفل انحصاری همان
+    روز را می‌گیرد. در SQLite اولین نوشتن کل دیتابیس را برای نوشتن قفل می‌کند.
+    """
+    if connection.vendor != "postgresql":
+        return
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    with connection.cursor() as cursor:
+        for day in days:
+            cursor.execute(f"SELECT {function}(%s, %s)", [DAY_LOCK_CLASS, day.toordinal()])
+
+
+def _days_to_rebuild():
+    order_days = (
+        Order.objects.filter(status__in=COUNTED_STATUSES)
+        .annotate(day=TruncDate("created_at")).values_list("day", flat=True).distinct().order_by()
+    )
+    return sorted(set(order_days) | set(DailySales.objects.values_list("day", flat=True).distinct().order_by()))
+
+
+def _rebuild_day(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+    with transaction.atomic():
+        _lock_days([day])
+        DailySales.objects.filter(day=day).delete()
+        rows = (
+            OrderItem.objects
+            .filter(order__created_at__gte=start, order__created_at__lt=end, order__status__in=COUNTED_STATUSES)
+            .values("product_id")
+            .annotate(units=Sum("quantity"), revenue=Sum(F("quantity") * F("price")), orders=Count("id"))
+            .order_by()
+        )
+        add_rows([(day, r["product_id"], r["units"], r["revenue"], r["orders"]) for r in rows])
+
+
+def rebuild():
+    """
+    جدول جمع فروش را روز به روز از روی اقلام سفارش از نو می‌سازد. هر روز در
+    تراکنش کوتاه خودش ساخته می‌شود: خواننده‌ها جمع قبلی یا جمع تازه آن روز را
+    می‌بینند و نه روز خالی یا نیمه‌کاره، و فقط تغییرهای افزایشی همان روز تا
+    commit آن منتظر می‌مانند؛ بعد روی جمع تازه اضافه می‌شوند، پس چیزی دو بار یا
+    هیچ بار شمرده نمی‌شود. اگر وسط کار خطا رخ دهد، روزهای ساخته‌شده می‌مانند و
+    بقیه جمع قبلی را دارند. خروجی: هر روز بعد از ساخته شدن.
+    """
+    for day in _days_to_rebuild():
+        _rebuild_day(day)
+        yield day
@@ -0,0 +1,135 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+
+# حروف عربی رایج در متن فارسی به معادل فارسی‌شان تبدیل می‌شوند و نیم‌فاصله
+# جداکننده کلمه حساب می‌شود؛ همین تبدیل در ایندکس هم انجام شده است.
+PERSIAN_NORMALIZATION = str.maketrans({"ي": "ی", "ك": "ک", "\u200c": " "})
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "auth_app_product_fts"
+
+# ستون generated با ایندکس GIN (مایگریشن 0018)؛ بردار موقع نوشتن ساخته می‌شود
+# و نه در جستجو
+POSTGRES_VECTOR = "search_vector"
+
+
+def normalize(text):
+    return text.translate(PERSIAN_NORMALIZATION)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(normalize(query or ""))[:10]
+
+
+def _sqlite_match(tokens):
+    # هر کلمه به صورت prefix جستجو می‌شود: "لپ"* ؛ کلمات با AND ترکیب می‌شوند
+    return " ".join('"{}"*'.format(token) for token in tokens)
+
+
+def _postgres_query(tokens):
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def _fallback_condition(tokens):
+    condition = Q()
+    for token in tokens:
+        condition &= Q(name__icontains=token) | Q(description__icontains=token)
+    return condition
+
+
+def _sqlite_search(tokens, limit, offset):
+    match = _sqlite_match(tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT rowid, bm25({FTS_TABLE}, 10.0, 1.0) AS score
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY score, rowid
+                LIMIT %s OFFSET %s""",
+            [match, limit, offset],
+        )
+        # bm25 هرچه کمتر باشد مرتبط‌تر است
+        return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+def _postgres_search(tokens, limit, offset):
+    tsquery = _postgres_query(tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT id, ts_rank({POSTGRES_VECTOR}, query) AS rank
+                FROM auth_app_product, to_tsquery('simple'::regconfig, %s) query
+                WHERE {POSTGRES_VECTOR} @@ query
+                ORDER BY rank DESC, id
+                LIMIT %s OFFSET %s""",
+            [tsquery, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def _fallback_search(tokens, limit, offset):
+    ids = Product.objects.filter(_fallback_condition(tokens)).order_by("id").values_list("id", flat=True)
+    return [(pk, 0) for pk in ids[offset:offset + limit]]
+
+
+def search_product_ids(query, limit, offset=0):
+    """
+    لیست (id, rank) محصولات مرتبط با query، مرتب‌شده از مرتبط‌ترین.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    if connection.vendor == "sqlite":
+        return _sqlite_search(tokens, limit, offset)
+    if connection.vendor == "postgresql":
+        return _postgres_search(tokens, limit, offset)
+    return _fallback_search(tokens, limit, offset)
+
+
+def search_filter(query):
+    """
+    شرط Q برای همه محصولات مرتبط با query، بدون رتبه و بدون سقف تعداد (مثلا برای admin).
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return Q(pk__in=[])
+
+    if connection.vendor == "sqlite":
+        ids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_sqlite_match(tokens)])
+    elif connection.vendor == "postgresql":
+        ids = RawSQL(
+            f"SELECT id FROM auth_app_product WHERE {POSTGRES_VECTOR} @@ to_tsquery('simple'::regconfig, %s)",
+            [_postgres_query(tokens)],
+        )
+    else:
+        return _fallback_condition(tokens)
+    return Q(pk__in=ids)
+
+
+def search_products(query, page=1, per_page=None):
+    """
+    یک صفحه از نتایج جستجو و اینکه صفحه بعدی وجود دارد یا نه.
+    """
+    per_page = per_page or settings.PRODUCTS_PER_PAGE
+    page = max(page, 1)
+
+    hits = search_product_ids(query, limit=per_page + 1, offset=(page - 1) * per_page)
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+
+    products = Product.objects.in_bulk([pk for pk, _ in hits])
+    results = []
+    for pk, rank in hits:
+        product = products.get(pk)
+        if product is not None:
+            product.rank = rank
+            results.append(product)
+    return results, has_next
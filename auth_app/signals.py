@@ -0,0 +1,88 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import catalog, sales, tasks
+from .cart_store import forget_summaries
+from .models import Cart, CartLine, Order, OrderItem, Product
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog.invalidate()
+
+
+@receiver(pre_delete, sender=Product)
+def forget_cart_summaries_of_product(sender, instance, **kwargs):
+    # ردیف‌های سبد با محصول حذف آبشاری می‌شوند و سیگنالی برای خودشان نمی‌آید
+    forget_summaries(CartLine.objects.filter(product_id=instance.pk).values_list("cart_id", flat=True))
+
+
+@receiver(pre_delete, sender=Cart)
+def forget_cart_summary(sender, instance, **kwargs):
+    forget_summaries([instance.pk])
+
+
+@receiver(post_save, sender=CartLine)
+def forget_cart_summary_of_line(sender, instance, **kwargs):
+    # DatabaseCartStore خودش خلاصه را تازه می‌کند؛ این برای save مستقیم (admin، shell) است
+    forget_summaries([instance.cart_id])
+
+
+@receiver(post_save, sender=Product)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if not instance.image:
+        if instance.thumbnails:
+            Product.objects.filter(pk=instance.pk).update(thumbnails={})
+        return
+    if instance.thumbnails.get("source") != instance.image.name:
+        tasks.generate_thumbnails.enqueue(product_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def update_order_total(sender, instance, **kwargs):
+    # bulk_create سیگنال نمی‌فرستد؛ checkout جمع کل را خودش ذخیره می‌کند
+    if OrderItem.order.is_cached(instance):
+        instance.order.recalculate_total()
+    else:
+        Order(pk=instance.order_id).recalculate_total()
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_status = Order.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+
+
+@receiver(post_save, sender=Order)
+def update_sales_on_status_change(sender, instance, created, **kwargs):
+    # سفارش تازه هنوز قلمی ندارد؛ checkout اقلامش را خودش در جمع فروش ثبت می‌کند
+    if created:
+        return
+    was_counted = sales.is_counted(getattr(instance, "_previous_status", instance.status))
+    if was_counted != sales.is_counted(instance.status):
+        sales.add_order(instance, 1 if sales.is_counted(instance.status) else -1)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_order_item(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_item = OrderItem.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=OrderItem)
+def update_sales_on_item_save(sender, instance, created, **kwargs):
+    order = instance.order
+    if not sales.is_counted(order.status):
+        return
+    previous = getattr(instance, "_previous_item", None)
+    if previous is None:
+        sales.add_items(sales.order_day(order), [instance])
+    else:
+        sales.replace_item(sales.order_day(order), previous, instance)
+
+
+@receiver(pre_delete, sender=OrderItem)
+def update_sales_on_item_delete(sender, instance, **kwargs):
+    order = instance.order
+    if sales.is_counted(order.status):
+        sales.add_items(sales.order_day(order), [instance], sign=-1)
@@ -0,0 +1,16 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    نام فایل‌های استاتیک هش محتوا دارد و نسخه gzip/brotli آن‌ها را collectstatic
+    از قبل می‌سازد؛ WhiteNoise آن‌ها را با کش طولانی سرو می‌کند.
+
+    تا collectstatic اجرا نشده (توسعه و تست‌ها) manifestی نیست و نام اصلی فایل
+    برگردانده می‌شود؛ پس همین storage در همه محیط‌ها و مستقل از DEBUG به کار می‌رود.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from . import images
+from .jobs import task
+from .models import Order
+
+
+@task
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related("user").prefetch_related("items__product").filter(pk=order_id).first()
+    if order is None or not order.user.email:
+        return
+    lines = "\n".join(f"- {item.product.name} × {item.quantity}: {item.total_price:,}" for item in order.items.all())
+    send_mail(
+        f"سفارش {order.id} ثبت شد",
+        f"سلام {order.user.username}،\n\nسفارش شما ثبت شد:\n{lines}\n\nجمع کل: {order.total:,}",
+        settings.DEFAULT_FROM_EMAIL,
+        [order.user.email],
+    )
+
+
+@task
+def generate_thumbnails(product_id):
+    images.generate(product_id)
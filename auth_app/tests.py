@@ -1,8 +1,41 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock, skipIf
+from datetime import timedelta
+from pathlib import Path
 from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from PIL import Image
+from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
-from django.urls import reverse
-from .models import Order, OrderItem, Product
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from . import async_views, catalog, jobs, routers, sales, throttle
+from . import url as app_urls
+from .backends import users_by_login
+from .cart_store import CacheCartStore, DatabaseCartStore, SessionCartStore, for_user
+from .forms import RegisterForm
+from .models import CartLine, DailySales, Job, Order, OrderItem, Product
+from .routers import ReplicaRouter, replica_reads
+from .search import search_filter, search_product_ids
+from .storage import StaticFilesStorage
 
 
 
@@ -69,6 +102,54 @@ class OrderAndOrderItemModelTests(TestCase):
         self.assertEqual(self.order.total_price, 1000)
 
 
+class OrderTotalTests(TestCase):
+    """
+    تست نگهداری جمع کل سفارش و لیست سفارش‌ها در پنل ادمین
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="12345")
+        self.product = Product.objects.create(name="Pen", description="Blue pen", price=15)
+        self.order = Order.objects.create(user=self.user)
+
+    def test_total_follows_item_changes(self):
+        item = OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=15)
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=10)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 40)
+
+        item.quantity = 4
+        item.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 70)
+
+        item.delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 10)
+
+    def test_total_price_does_not_query(self):
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=3, price=15)
+        order = Order.objects.get(pk=self.order.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.total_price, 45)
+
+    def test_admin_changelist_query_count_is_constant(self):
+        admin_user = User.objects.create_superuser(username="boss", password="12345")
+        self.client.force_login(admin_user)
+        url = reverse("admin:auth_app_order_changelist")
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for _ in range(10):
+            order = Order.objects.create(user=self.user)
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=15)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url + "?o=5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+
 class HomeAndProductsViewsTests(TestCase):
     """
     تست صفحه اصلی و لیست محصولات
@@ -101,6 +182,310 @@ class HomeAndProductsViewsTests(TestCase):
         self.assertContains(response, "Tablet")
 
 
+@override_settings(PRODUCTS_PER_PAGE=2)
+class CatalogPaginationTests(TestCase):
+    """
+    تست صفحه‌بندی keyset در لیست محصولات
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.products = [
+            Product.objects.create(name=f"P{i}", description="desc", price=price)
+            for i, price in enumerate([40, 10, 30, 10, 20])
+        ]
+
+    def names(self, response):
+        return [p.name for p in response.context["products"]]
+
+    def test_first_page_is_limited_to_page_size(self):
+        response = self.client.get(reverse("home"))
+        self.assertEqual(self.names(response), ["P0", "P1"])
+        self.assertIsNone(response.context["previous_query"])
+        self.assertIsNotNone(response.context["next_query"])
+
+    def test_walk_forward_and_back_by_price(self):
+        seen = []
+        url = reverse("products") + "?sort=price"
+        while url:
+            response = self.client.get(url)
+            seen.extend(self.names(response))
+            next_query = response.context["next_query"]
+            url = reverse("products") + "?" + next_query if next_query else None
+
+        # قیمت‌های برابر بر اساس id مرتب می‌شوند
+        self.assertEqual(seen, ["P1", "P3", "P4", "P2", "P0"])
+
+        previous = self.client.get(reverse("products") + "?" + response.context["previous_query"])
+        self.assertEqual(self.names(previous), ["P4", "P2"])
+
+    def test_new_rows_do_not_shift_next_page(self):
+        first = self.client.get(reverse("home"))
+        Product.objects.create(name="New", description="desc", price=1)
+        second = self.client.get(reverse("home") + "?" + first.context["next_query"])
+        self.assertEqual(self.names(second), ["P2", "P3"])
+
+    def test_catalog_query_does_not_use_offset(self):
+        first = self.client.get(reverse("home"))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("home") + "?" + first.context["next_query"])
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).upper()
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse("home") + "?after=not-a-cursor")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(response), ["P0", "P1"])
+
+
+class CatalogCacheTests(TestCase):
+    """
+    تست کش کاتالوگ و باطل شدن آن با تغییر محصولات
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.product = Product.objects.create(name="Camera", description="Digital camera", price=700)
+
+    def test_second_request_does_not_query_products(self):
+        self.client.get(reverse("home"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("home"))
+        self.assertContains(response, "Camera")
+        self.assertFalse(any("auth_app_product" in q["sql"] for q in ctx.captured_queries))
+
+    def test_detail_is_cached(self):
+        url = reverse("product_detail", args=[self.product.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertContains(response, "Camera")
+        self.assertFalse(any("auth_app_product" in q["sql"] for q in ctx.captured_queries))
+
+    def test_missing_product_returns_404(self):
+        response = self.client.get(reverse("product_detail", args=[self.product.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_save_and_delete_invalidate_cache(self):
+        self.client.get(reverse("home"))
+
+        self.product.name = "Camera Pro"
+        self.product.save()
+        self.assertContains(self.client.get(reverse("home")), "Camera Pro")
+
+        self.product.delete()
+        self.assertNotContains(self.client.get(reverse("home")), "Camera Pro")
+
+    @override_settings(CATALOG_STATS_SAMPLE_RATE=1)
+    def test_hit_and_miss_counters(self):
+        self.client.get(reverse("home"))
+        first = catalog.stats()
+        self.client.get(reverse("home"))
+        second = catalog.stats()
+
+        self.assertGreater(first["misses"], 0)
+        self.assertEqual(second["misses"], first["misses"])
+        self.assertGreater(second["hits"], first["hits"])
+
+    @override_settings(CATALOG_STATS_SAMPLE_RATE=1)
+    def test_counters_stay_out_of_the_default_cache(self):
+        self.client.get(reverse("home"))
+        self.assertIsNone(cache.get(catalog.HITS_KEY))
+        self.assertIsNone(cache.get(catalog.MISSES_KEY))
+        self.assertIsNotNone(caches["stats"].get(catalog.MISSES_KEY))
+
+    def test_unsampled_requests_write_no_counters(self):
+        before = catalog.stats()
+        with override_settings(CATALOG_STATS_SAMPLE_RATE=0):
+            self.client.get(reverse("home"))
+            self.client.get(reverse("home"))
+        self.assertEqual(catalog.stats(), before)
+
+
+class CatalogPageCacheTests(TestCase):
+    """
+    تست کش صفحه برای مهمان‌ها و کش قطعه کاتالوگ برای کاربران واردشده
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="reader", password="12345")
+        Product.objects.create(name="Lamp", description="Desk lamp", price=80)
+
+    def test_anonymous_page_is_served_without_rendering(self):
+        self.client.get(reverse("home"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("home"))
+        self.assertContains(response, "Lamp")
+        self.assertIsNone(response.context)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertIn("Cookie", response["Vary"])
+
+    @override_settings(CATALOG_STATS_SAMPLE_RATE=1)
+    def test_unrelated_and_invalid_parameters_share_the_cached_page(self):
+        self.client.get(reverse("home"), {"sort": "price"})
+        misses = catalog.stats()["misses"]
+        for params in (
+            {"sort": "price", "utm_source": "ad"},
+            {"sort": "price", "after": "not-a-cursor"},
+            {"sort": "price", "page": "7", "x": "1"},
+        ):
+            response = self.client.get(reverse("home"), params)
+            self.assertIsNone(response.context, params)
+        self.assertEqual(catalog.stats()["misses"], misses)
+
+        response = self.client.get(reverse("home"), {"sort": "bogus"})
+        self.assertIsNotNone(response.context)
+
+    def test_logged_in_user_gets_own_navbar_with_cached_grid(self):
+        self.client.get(reverse("home"))
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("home"))
+
+        self.assertContains(response, "reader")
+        self.assertContains(response, "Lamp")
+        self.assertFalse(any("auth_app_product" in q["sql"] for q in ctx.captured_queries))
+
+    def test_pending_messages_bypass_page_cache(self):
+        self.client.get(reverse("home"))
+        # add_to_cart برای مهمان پیام می‌گذارد و به login ریدایرکت می‌کند
+        self.client.get(reverse("add_to_cart", args=[1]))
+
+        response = self.client.get(reverse("home"))
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, "alert-info")
+
+
+class AsyncUrlconf:
+    """
+    همان URLها ولی با viewهای async؛ مثل حالت ASYNC_CATALOG_VIEWS=1
+    """
+    urlpatterns = [
+        path(
+            str(pattern.pattern),
+            getattr(async_views, pattern.callback.__name__)
+            if pattern.callback.__module__ == "auth_app.views" and hasattr(async_views, pattern.callback.__name__)
+            else pattern.callback,
+            name=pattern.name,
+        )
+        for pattern in app_urls.urlpatterns
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncUrlconf)
+class AsyncCatalogViewsTests(TestCase):
+    """
+    تست viewهای async کاتالوگ و سبد خرید
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="async", password="12345")
+        self.product = Product.objects.create(name="Speaker", description="Loud speaker", price=120)
+
+    async def test_home_and_products_render_catalog(self):
+        for name in ("home", "products"):
+            response = await self.async_client.get(reverse(name))
+            self.assertContains(response, "Speaker")
+
+    async def test_anonymous_page_is_cached(self):
+        await self.async_client.get(reverse("home"))
+        response = await self.async_client.get(reverse("home"))
+        self.assertIsNone(response.context)
+        self.assertContains(response, "Speaker")
+
+    async def test_product_detail_and_404(self):
+        response = await self.async_client.get(reverse("product_detail", args=[self.product.id]))
+        self.assertContains(response, "Speaker")
+
+        response = await self.async_client.get(reverse("product_detail", args=[self.product.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_cart_for_logged_in_user(self):
+        await sync_to_async(for_user(self.user).set)(self.product.id, 2)
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse("cart"))
+
+        self.assertContains(response, "Speaker")
+        self.assertContains(response, "240")
+        self.assertContains(response, "async")
+
+
+class ProductSearchTests(TestCase):
+    """
+    تست جستجوی متنی محصولات
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.laptop = Product.objects.create(name="لپ‌تاپ ایسوس", description="صفحه نمایش بزرگ", price=900)
+        self.bag = Product.objects.create(name="کیف", description="مناسب برای لپ‌تاپ", price=50)
+        self.mouse = Product.objects.create(name="Wireless Mouse", description="Good mouse", price=20)
+
+    def search(self, q, **params):
+        return self.client.get(reverse("product_search"), {"q": q, **params})
+
+    def names(self, response):
+        return [p.name for p in response.context["products"]]
+
+    def test_prefix_match_ranks_name_above_description(self):
+        response = self.search("لپ")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(response), ["لپ‌تاپ ایسوس", "کیف"])
+
+    def test_arabic_letters_are_normalized(self):
+        # «ي» و «ك» عربی باید با «ی» و «ک» فارسی یکی حساب شوند
+        response = self.search("كيف")
+        self.assertEqual(self.names(response), ["کیف"])
+
+    def test_multiple_words_are_combined(self):
+        response = self.search("wire mou")
+        self.assertEqual(self.names(response), ["Wireless Mouse"])
+
+    def test_index_follows_update_and_delete(self):
+        self.mouse.name = "Keyboard"
+        self.mouse.save()
+        self.assertEqual(self.names(self.search("keyb")), ["Keyboard"])
+
+        self.mouse.delete()
+        self.assertEqual(self.names(self.search("keyb")), [])
+
+    @override_settings(PRODUCTS_PER_PAGE=1)
+    def test_results_are_paginated(self):
+        first = self.search("لپ")
+        self.assertEqual(self.names(first), ["لپ‌تاپ ایسوس"])
+        self.assertIsNotNone(first.context["next_query"])
+
+        second = self.search("لپ", page=2)
+        self.assertEqual(self.names(second), ["کیف"])
+        self.assertIsNone(second.context["next_query"])
+
+    def test_empty_query_returns_no_results(self):
+        response = self.search("  ")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(response), [])
+
+    def test_filter_returns_every_match_without_limit(self):
+        Product.objects.bulk_create(Product(name=f"لپ‌تاپ {i}", price=i) for i in range(30))
+        self.assertEqual(Product.objects.filter(search_filter("لپ")).count(), 32)
+        self.assertFalse(Product.objects.filter(search_filter("!!")).exists())
+
+    def test_filter_uses_search_index(self):
+        index = "auth_app_product_fts"
+        if connection.vendor == "postgresql":
+            index = "product_search_vector_idx"
+            # GIN فقط bitmap scan دارد و روی جدول کوچک تست، planner پیمایش pkey با
+            # Filter را ارزان‌تر می‌داند
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_indexscan = off")
+        self.assertIn(index, _query_plan(Product.objects.filter(search_filter("لپ"))))
+
+
 class RegisterLoginLogoutTests(TestCase):
     """
     تست ثبت‌نام / ورود / خروج
@@ -152,6 +537,153 @@ class RegisterLoginLogoutTests(TestCase):
         self.assertEqual(response.status_code, 302)
 
 
+def _query_plan(queryset):
+    """
+    خروجی EXPLAIN کوئری؛ روی PostgreSQL با enable_seqscan=off، چون جدول‌های تست
+    کوچک‌اند و planner بدون آن seq scan را ارزان‌تر می‌داند. اگر ایندکس مناسبی
+    نباشد باز هم Seq Scan در plan می‌ماند.
+    """
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+class LoginBackendTests(TestCase):
+    """
+    پیدا کردن کاربر با نام کاربری یا ایمیل در یک کوئری ایندکس‌دار
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="Sara", email="Sara@Example.com", password="12345")
+
+    def test_email_and_username_are_case_insensitive(self):
+        for login in ("sara@example.com", "SARA@EXAMPLE.COM", "sara", "Sara"):
+            self.assertEqual(authenticate(username=login, password="12345"), self.user)
+        self.assertIsNone(authenticate(username="sara@example.com", password="wrong"))
+        self.assertIsNone(authenticate(username="nobody", password="12345"))
+
+    def test_lookup_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(users_by_login("sara@example.com")), [self.user])
+
+    def test_exact_username_wins_over_email(self):
+        other = User.objects.create_user(username="sara@example.com", email="other@example.com", password="12345")
+        self.assertEqual(authenticate(username="sara@example.com", password="12345"), other)
+
+    def test_email_is_unique_ignoring_case_but_blank_is_allowed(self):
+        User.objects.create_user(username="blank1", password="12345")
+        User.objects.create_user(username="blank2", password="12345")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username="copy", email="SARA@example.com", password="12345")
+
+    def test_register_rejects_email_with_other_case(self):
+        form = RegisterForm(data={
+            "username": "newuser",
+            "email": "sara@EXAMPLE.com",
+            "password1": "StrongPass12345",
+            "password2": "StrongPass12345",
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn("email", form.errors)
+
+    def test_lookup_uses_expression_indexes(self):
+        plan = _query_plan(users_by_login("sara@example.com"))
+        self.assertIn("auth_user_email_upper_uniq", plan)
+        self.assertIn("auth_user_username_upper_idx", plan)
+
+
+@override_settings(
+    LOGIN_THROTTLE={"ip": (5, 60), "account": (3, 60)},
+    REGISTER_THROTTLE={"ip": (2, 60)},
+)
+class LoginThrottleTests(TestCase):
+    """
+    محدودیت تلاش‌های ورود و ثبت‌نام قبل از هش رمز
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="victim", email="victim@example.com", password="12345")
+
+    def login(self, username, password="wrong", ip="10.0.0.1"):
+        return self.client.post(reverse("login"), {"username": username, "password": password}, REMOTE_ADDR=ip)
+
+    def test_account_is_blocked_without_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login("victim").status_code, 200)
+
+        with mock.patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.encode") as encode:
+            response = self.login("VICTIM", password="12345", ip="10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+        encode.assert_not_called()
+        self.assertEqual(throttle.stats()["login:account"], 1)
+
+    def test_username_and_email_share_the_account_counter(self):
+        self.login("victim")
+        self.login("Victim@Example.com", ip="10.0.0.2")
+        self.login(" VICTIM ", ip="10.0.0.3")
+
+        self.assertEqual(self.login("victim@example.com", password="12345", ip="10.0.0.4").status_code, 429)
+        # login ناشناخته شمارنده جدای خودش را دارد
+        self.assertEqual(self.login("nobody", ip="10.0.0.5").status_code, 200)
+
+    def test_login_looks_up_the_user_once(self):
+        # یک کوئری برای پیدا کردن کاربر؛ throttle و authenticate آن را با هم شریک‌اند
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login(" Victim@Example.com ").status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.login("victim@example.com", password="12345").status_code, 302)
+        lookups = [q["sql"] for q in ctx.captured_queries if "UPPER" in q["sql"] and "auth_user" in q["sql"]]
+        self.assertEqual(len(lookups), 1)
+
+    def test_ip_is_blocked_across_accounts(self):
+        for n in range(5):
+            self.login(f"user{n}")
+
+        self.assertEqual(self.login("victim", password="12345").status_code, 429)
+        self.assertEqual(self.login("victim", password="12345", ip="10.0.0.9").status_code, 302)
+
+    def test_successful_login_resets_account_counter(self):
+        self.login("victim")
+        self.login("victim")
+        self.assertEqual(self.login("victim", password="12345").status_code, 302)
+        self.client.logout()
+
+        self.login("victim")
+        self.login("victim")
+        self.assertEqual(self.login("victim", password="12345").status_code, 302)
+
+    def test_previous_window_still_counts(self):
+        with mock.patch("auth_app.throttle.time.time", return_value=1000 * 60 + 59):
+            for _ in range(3):
+                self.login("victim")
+        # ثانیه اول پنجره بعد: ۲.۹۵ از شمارنده قبلی رو به بالا ۳ و به سقف رسیده است
+        with mock.patch("auth_app.throttle.time.time", return_value=1001 * 60 + 1):
+            self.assertEqual(self.login("victim", password="12345").status_code, 429)
+        # نیمه پنجره: ۱.۵ گرد می‌شود به ۲ و یک تلاش دیگر مجاز است
+        with mock.patch("auth_app.throttle.time.time", return_value=1001 * 60 + 30):
+            self.assertEqual(self.login("victim").status_code, 200)
+            self.assertEqual(self.login("victim", password="12345").status_code, 429)
+        with mock.patch("auth_app.throttle.time.time", return_value=1002 * 60 + 1):
+            self.assertEqual(self.login("victim", password="12345").status_code, 302)
+
+    def test_register_is_throttled_per_ip(self):
+        for n in range(2):
+            self.client.post(reverse("register"), {
+                "username": f"new{n}", "email": f"new{n}@example.com",
+                "password1": "StrongPass12345", "password2": "StrongPass12345",
+            })
+
+        response = self.client.post(reverse("register"), {
+            "username": "new9", "email": "new9@example.com",
+            "password1": "StrongPass12345", "password2": "StrongPass12345",
+        })
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(username="new9").exists())
+
+
 class CartAndCheckoutTests(TestCase):
     """
     تست‌های مربوط به سبد خرید و checkout
@@ -194,32 +726,28 @@ class CartAndCheckoutTests(TestCase):
         expected = f"{login_url}?{urlencode({'next': referer})}"
         self.assertEqual(response["Location"], expected)
 
-    def test_add_to_cart_when_logged_in_adds_session_cart(self):
+    def test_add_to_cart_when_logged_in_adds_to_cart(self):
         self.client.login(username="buyer", password="12345")
 
         response = self.client.get(reverse("add_to_cart", args=[self.product.id]))
         self.assertEqual(response.status_code, 302)
 
-        session = self.client.session
-        cart = session.get("cart", {})
-        self.assertIn(str(self.product.id), cart)
-        self.assertEqual(cart[str(self.product.id)], 1)
+        cart = for_user(self.user).lines()
+        self.assertIn(self.product.id, cart)
+        self.assertEqual(cart[self.product.id], 1)
 
     def test_remove_from_cart_deletes_item(self):
         self.client.login(username="buyer", password="12345")
 
-        # Arrange: دستی در سشن سبد خرید می‌گذاریم
-        session = self.client.session
-        session["cart"] = {str(self.product.id): 2}
-        session.save()
+        # Arrange: دستی در سبد خرید می‌گذاریم
+        for_user(self.user).set(self.product.id, 2)
 
         # Act
         response = self.client.get(reverse("remove_from_cart", args=[self.product.id]))
         self.assertEqual(response.status_code, 302)
 
         # Assert
-        session = self.client.session
-        self.assertNotIn(str(self.product.id), session.get("cart", {}))
+        self.assertNotIn(self.product.id, for_user(self.user).lines())
 
     def test_checkout_requires_login(self):
         response = self.client.get(reverse("checkout"))
@@ -229,9 +757,7 @@ class CartAndCheckoutTests(TestCase):
         self.client.login(username="buyer", password="12345")
 
         # cart خالی
-        session = self.client.session
-        session["cart"] = {}
-        session.save()
+        for_user(self.user).clear()
 
         response = self.client.get(reverse("checkout"))
         self.assertEqual(response.status_code, 302)
@@ -241,9 +767,7 @@ class CartAndCheckoutTests(TestCase):
         self.client.login(username="buyer", password="12345")
 
         # Arrange: cart با یک محصول
-        session = self.client.session
-        session["cart"] = {str(self.product.id): 3}
-        session.save()
+        for_user(self.user).set(self.product.id, 3)
 
         # Act
         response = self.client.get(reverse("checkout"))
@@ -262,8 +786,444 @@ class CartAndCheckoutTests(TestCase):
         self.assertEqual(item.price, self.product.price)
 
         # Assert: cart پاک شده
-        session = self.client.session
-        self.assertEqual(session.get("cart"), {})
+        self.assertEqual(for_user(self.user).lines(), {})
+
+
+class CartStoreTests(TestCase):
+    """
+    تست پیاده‌سازی‌های مختلف ذخیره سبد خرید
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shopper", password="12345")
+        self.first = Product.objects.create(name="A", description="desc", price=10)
+        self.second = Product.objects.create(name="B", description="desc", price=20)
+
+    def stores(self):
+        return [
+            DatabaseCartStore(self.user),
+            CacheCartStore(self.user),
+            SessionCartStore(self.client.session),
+        ]
+
+    def test_all_stores_share_the_same_behaviour(self):
+        for store in self.stores():
+            with self.subTest(store=type(store).__name__):
+                store.add(self.first.id)
+                store.add(self.first.id, 2)
+                store.set(self.second.id, 5)
+                self.assertEqual(store.lines(), {self.first.id: 3, self.second.id: 5})
+
+                self.assertEqual(store.remove([self.second.id]), 1)
+                self.assertEqual(store.remove([self.second.id]), 0)
+                store.set(self.first.id, 0)
+                self.assertEqual(store.lines(), {})
+
+                store.add(self.first.id)
+                store.clear()
+                self.assertEqual(store.lines(), {})
+
+    def test_database_store_updates_existing_line_in_one_query(self):
+        store = DatabaseCartStore(self.user)
+        store.add(self.first.id)
+        with self.assertNumQueries(1):
+            store.add(self.first.id)
+        self.assertEqual(store.lines(), {self.first.id: 2})
+
+    def test_cache_store_changes_wait_for_each_other(self):
+        store = CacheCartStore(self.user)
+        store.add(self.first.id)
+        # درخواست دیگری وسط تغییر سبد است
+        cache.add(store.lock_key, 1)
+        thread = threading.Thread(
+            target=CacheCartStore(self.user).add, args=(self.second.id,), kwargs={"price": self.second.price},
+        )
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+
+        # تغییر آن درخواست؛ add منتظر ماند و آن را بازنویسی نمی‌کند
+        lines = store.lines()
+        lines[self.first.id] += 2
+        cache.set(store.key, lines)
+        cache.delete(store.lock_key)
+        thread.join()
+        self.assertEqual(store.lines(), {self.first.id: 3, self.second.id: 1})
+
+    def test_cart_survives_logout(self):
+        self.client.login(username="shopper", password="12345")
+        self.client.get(reverse("add_to_cart", args=[self.first.id]))
+        self.client.get(reverse("logout"))
+
+        self.client.login(username="shopper", password="12345")
+        response = self.client.get(reverse("cart"))
+        self.assertContains(response, "A")
+
+    def test_add_unknown_product_returns_404(self):
+        self.client.login(username="shopper", password="12345")
+        response = self.client.get(reverse("add_to_cart", args=[self.second.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CartSummaryTests(TestCase):
+    """
+    خلاصه سبد در navbar بدون کوئری، با قیمت زمان افزودن
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shopper", password="12345")
+        self.product = Product.objects.create(name="A", description="desc", price=50)
+        self.client.force_login(self.user)
+
+    def add(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("add_to_cart", args=[self.product.id]))
+
+    def test_navbar_shows_badge_without_cart_queries(self):
+        self.add()
+        self.add()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("orders"))
+
+        self.assertContains(response, '<span class="cart-badge" title="1 محصول، 100 تومان">2</span>', html=True)
+        self.assertFalse([q["sql"] for q in queries if "cartline" in q["sql"]])
+
+    def test_subtotal_uses_price_at_add_time(self):
+        self.add()
+        Product.objects.filter(pk=self.product.pk).update(price=70)
+        cache.clear()
+
+        self.assertEqual(DatabaseCartStore(self.user).summary(), {"lines": 1, "units": 1, "subtotal": 50})
+
+    def test_remove_and_checkout_update_summary(self):
+        self.add()
+        self.add()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("checkout"))
+
+        self.assertEqual(cache.get(f"cart-summary:{self.user.pk}"), {"lines": 0, "units": 0, "subtotal": 0})
+        self.assertNotContains(self.client.get(reverse("orders")), "cart-badge")
+
+    def test_product_delete_updates_every_cart_summary(self):
+        other = User.objects.create_user(username="other", password="12345")
+        kept = Product.objects.create(name="B", description="desc", price=20)
+        for user in (self.user, other):
+            with self.captureOnCommitCallbacks(execute=True):
+                for_user(user).add(self.product.id, price=50)
+                for_user(user).add(kept.id, price=20)
+            self.assertEqual(DatabaseCartStore(user).summary()["units"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+
+        for user in (self.user, other):
+            self.assertEqual(DatabaseCartStore(user).summary(), {"lines": 1, "units": 1, "subtotal": 20})
+
+    def test_direct_line_save_updates_summary(self):
+        self.add()
+        store = DatabaseCartStore(self.user)
+        self.assertEqual(store.summary()["units"], 1)
+
+        line = CartLine.objects.get(cart_id=self.user.pk)
+        line.quantity = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            line.save()
+        self.assertEqual(store.summary()["units"], 5)
+
+    def test_rolled_back_change_leaves_no_stale_summary(self):
+        store = DatabaseCartStore(self.user)
+        store.summary()
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            store.add(self.product.id, 3)
+            raise RuntimeError
+
+        self.assertEqual(store.summary()["units"], 0)
+
+    def test_all_stores_summarize_the_same(self):
+        for store in (DatabaseCartStore(self.user), CacheCartStore(self.user), SessionCartStore(self.client.session)):
+            with self.subTest(store=type(store).__name__), self.captureOnCommitCallbacks(execute=True):
+                store.add(self.product.id, 2, price=40)
+                store.set(self.product.id, 3, price=45)
+                self.assertEqual(store.summary(), {"lines": 1, "units": 3, "subtotal": 135})
+                store.remove([self.product.id])
+                self.assertEqual(store.summary(), {"lines": 0, "units": 0, "subtotal": 0})
+
+    def test_anonymous_navbar_does_not_open_session(self):
+        self.client.logout()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("cart"))
+
+        self.assertEqual(len(queries), 0)
+
+
+class CartApiTests(TestCase):
+    """
+    تست API های JSON کاتالوگ و سبد خرید
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="api", password="12345")
+        self.first = Product.objects.create(name="کتاب", description="desc", price=10)
+        self.second = Product.objects.create(name="دفتر", description="desc", price=20)
+
+    def batch(self, operations):
+        return self.client.post(
+            reverse("api_cart_batch"),
+            data=json.dumps({"operations": operations}),
+            content_type="application/json",
+        )
+
+    def test_products_list_is_paginated(self):
+        with override_settings(PRODUCTS_PER_PAGE=1):
+            first = self.client.get(reverse("api_products")).json()
+            second = self.client.get(reverse("api_products"), {"after": first["next"]}).json()
+
+        self.assertEqual([p["name"] for p in first["results"]], ["کتاب"])
+        self.assertEqual([p["name"] for p in second["results"]], ["دفتر"])
+        self.assertIsNone(second["next"])
+
+    @override_settings(CATALOG_STATS_SAMPLE_RATE=1, PRODUCTS_PER_PAGE=1)
+    def test_invalid_parameters_share_the_cached_page(self):
+        first = self.client.get(reverse("api_products")).json()
+        self.client.get(reverse("api_products"), {"after": first["next"]})
+        misses = catalog.stats()["misses"]
+        for params in (
+            {"sort": "bogus"},
+            {"utm_source": "ad"},
+            {"after": first["next"].rstrip("=") + "=="},
+            {"after": first["next"], "before": "not-a-cursor"},
+        ):
+            self.assertEqual(self.client.get(reverse("api_products"), params).status_code, 200, params)
+        self.assertEqual(catalog.stats()["misses"], misses)
+
+    def test_invalid_cursor_is_rejected(self):
+        for params in ({"after": "not-a-cursor"}, {"before": "W10"}, {"sort": "price", "after": "WyJ4Il0"}):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse("api_products"), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_batch_requires_login(self):
+        response = self.batch([{"op": "add", "product_id": self.first.id}])
+        self.assertEqual(response.status_code, 401)
+
+    def test_batch_applies_all_operations_and_returns_cart(self):
+        self.client.force_login(self.user)
+        for_user(self.user).set(self.second.id, 1)
+
+        response = self.batch([
+            {"op": "add", "product_id": self.first.id, "quantity": 2},
+            {"op": "add", "product_id": self.first.id},
+            {"op": "remove", "product_id": self.second.id},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(data["total_price"], 30)
+        self.assertEqual(for_user(self.user).lines(), {self.first.id: 3})
+
+        self.assertEqual(self.client.get(reverse("api_cart")).json(), data)
+
+    def test_batch_with_unknown_product_changes_nothing(self):
+        self.client.force_login(self.user)
+        response = self.batch([
+            {"op": "add", "product_id": self.first.id},
+            {"op": "set", "product_id": self.second.id + 100, "quantity": 2},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(for_user(self.user).lines(), {})
+
+    def test_batch_rejects_invalid_payload(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.batch([{"op": "explode", "product_id": 1}]).status_code, 400)
+        self.assertEqual(self.batch([{"op": "set", "product_id": "1"}]).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+        response = self.client.post(reverse("api_cart_batch"), data="{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class CheckoutBulkWriteTests(TestCase):
+    """
+    تست ثبت سفارش به صورت یکجا (bulk) و اتمیک
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="bulk", password="12345")
+        self.client.login(username="bulk", password="12345")
+        self.products = [
+            Product.objects.create(name=f"Item {i}", description="desc", price=10 * (i + 1))
+            for i in range(10)
+        ]
+
+    def set_cart(self, cart):
+        store = for_user(self.user)
+        store.clear()
+        for product_id, quantity in cart.items():
+            store.set(product_id, quantity)
+
+    def checkout_queries(self, products):
+        self.set_cart({p.id: 2 for p in products})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("checkout"))
+        self.assertEqual(response.status_code, 302)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        small = self.checkout_queries(self.products[:1])
+        large = self.checkout_queries(self.products)
+        self.assertEqual(small, large)
+
+    def test_order_total_is_recorded(self):
+        self.set_cart({self.products[0].id: 2, self.products[1].id: 1})
+        self.client.get(reverse("checkout"))
+
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.total, 10 * 2 + 20)
+        self.assertEqual(order.items.count(), 2)
+
+    def test_deleted_products_are_dropped(self):
+        stale_id = self.products[-1].id
+        self.set_cart({self.products[0].id: 1, stale_id: 4})
+        self.products[-1].delete()
+
+        self.client.get(reverse("checkout"))
+
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(list(order.items.values_list("product_id", flat=True)), [self.products[0].id])
+        self.assertEqual(for_user(self.user).lines(), {})
+
+    def test_cart_with_only_deleted_products_creates_no_order(self):
+        self.set_cart({self.products[0].id: 1})
+        self.products[0].delete()
+
+        response = self.client.get(reverse("checkout"))
+
+        self.assertEqual(response["Location"], reverse("cart"))
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(for_user(self.user).lines(), {})
+
+    def test_failed_item_insert_rolls_back_order(self):
+        self.set_cart({self.products[0].id: 1})
+
+        with mock.patch.object(OrderItem.objects, "bulk_create", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.get(reverse("checkout"))
+
+        self.assertFalse(Order.objects.exists())
+
+
+class StockReservationTests(TestCase):
+    """
+    تست کم شدن اتمیک موجودی هنگام ثبت سفارش
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="stock", password="12345")
+        self.client.login(username="stock", password="12345")
+        self.limited = Product.objects.create(name="Limited", description="desc", price=100, stock=3)
+        self.unlimited = Product.objects.create(name="Unlimited", description="desc", price=5)
+
+    def test_reserve_stock_only_updates_rows_with_enough_stock(self):
+        other = Product.objects.create(name="Other", description="desc", price=1, stock=1)
+        remaining = Product.objects.reserve_stock({self.limited.id: 2, other.id: 5})
+
+        self.assertEqual(remaining, {self.limited.id: 1})
+        self.limited.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.limited.stock, other.stock), (1, 1))
+
+    def test_checkout_decrements_stock(self):
+        store = for_user(self.user)
+        store.set(self.limited.id, 2)
+        store.set(self.unlimited.id, 10)
+
+        self.client.get(reverse("checkout"))
+
+        self.limited.refresh_from_db()
+        self.unlimited.refresh_from_db()
+        self.assertEqual(self.limited.stock, 1)
+        self.assertIsNone(self.unlimited.stock)
+        self.assertEqual(Order.objects.get(user=self.user).items.count(), 2)
+
+    def test_unfulfillable_line_is_rejected_and_kept_in_cart(self):
+        store = for_user(self.user)
+        store.set(self.limited.id, 4)
+        store.set(self.unlimited.id, 1)
+
+        self.client.get(reverse("checkout"))
+
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(list(order.items.values_list("product_id", flat=True)), [self.unlimited.id])
+        self.assertEqual(order.total, 5)
+        self.assertEqual(store.lines(), {self.limited.id: 4})
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.stock, 3)
+
+    def test_nothing_fulfillable_creates_no_order(self):
+        for_user(self.user).set(self.limited.id, 4)
+        response = self.client.get(reverse("checkout"))
+        self.assertEqual(response["Location"], reverse("cart"))
+        self.assertFalse(Order.objects.exists())
+
+    def test_sold_out_product_is_shown_as_unavailable(self):
+        self.client.get(reverse("home"))
+        for_user(self.user).set(self.limited.id, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("checkout"))
+
+        self.assertContains(self.client.get(reverse("home")), "ناموجود")
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite فقط یک نویسنده هم‌زمان دارد و جدول را قفل می‌کند")
+class StockConcurrencyTests(TransactionTestCase):
+    """
+    چند ترد هم‌زمان یک محصول پرتقاضا را می‌خرند؛ نباید بیش از موجودی فروخته شود
+    """
+
+    THREADS = 8
+    ATTEMPTS = 5
+
+    def test_concurrent_checkouts_never_oversell(self):
+        product = Product.objects.create(name="Hot", description="desc", price=10, stock=20)
+        users = [User.objects.create_user(username=f"rush{i}", password="x") for i in range(self.THREADS)]
+        latencies = []
+        errors = []
+
+        def buy(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                for _ in range(self.ATTEMPTS):
+                    for_user(user).set(product.id, 1)
+                    started = time.perf_counter()
+                    client.get(reverse("checkout"))
+                    latencies.append(time.perf_counter() - started)
+            except Exception as exc:  # noqa: BLE001
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).aggregate(total=Sum("quantity"))["total"]
+        self.assertEqual(sold, 20)
+        self.assertEqual(product.stock, 0)
+        self.assertLess(max(latencies), 5)
 
 
 class AddProductAccessTests(TestCase):
@@ -301,4 +1261,886 @@ class AddProductAccessTests(TestCase):
     def test_add_product_page_accessible_for_staff(self):
         self.client.login(username="admin", password="12345")
         response = self.client.get(reverse("add_product"))
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+class LoadTestCommandsTests(TestCase):
+    """
+    seed_data داده ساختگی می‌سازد و benchmark_routes گزارش JSON هر route را ذخیره می‌کند.
+    """
+
+    def test_every_route_has_a_benchmark_scenario(self):
+        from .management.commands.benchmark_routes import SCENARIOS, SKIPPED
+
+        self.assertEqual({p.name for p in app_urls.urlpatterns} - SKIPPED, set(SCENARIOS))
+
+    def test_seed_data_creates_orders_with_totals(self):
+        call_command(
+            "seed_data", products=20, users=5, order_items=30, items_per_order=3, batch_size=7,
+            stdout=io.StringIO(),
+        )
+
+        self.assertEqual(Product.objects.count(), 20)
+        self.assertEqual(User.objects.filter(username__startswith="seed").count(), 5)
+        self.assertEqual(OrderItem.objects.count(), 30)
+        order = Order.objects.first()
+        saved_total = order.total
+        self.assertEqual(saved_total, order.recalculate_total(save=False))
+
+    def test_benchmark_routes_writes_json_report(self):
+        call_command("seed_data", products=10, users=2, order_items=6, items_per_order=3, stdout=io.StringIO())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            call_command(
+                "benchmark_routes", routes=["home", "cart", "checkout", "orders", "order_detail"], requests=3,
+                concurrency=1, host="testserver", output=output, stdout=io.StringIO(),
+            )
+            with open(output) as fh:
+                report = json.load(fh)
+
+        self.assertEqual(set(report["routes"]), {"home", "cart", "checkout", "orders", "order_detail"})
+        self.assertEqual(report["dataset"]["products"], 10)
+        for summary in report["routes"].values():
+            self.assertEqual(summary["requests"], 3)
+            self.assertEqual(summary["errors"], 0)
+            self.assertIsNotNone(summary["latency_ms"]["p95"])
+
+
+class ImportProductsCommandTests(TestCase):
+    """
+    import جریانی محصولات از CSV/JSONL با upsert روی sku
+    """
+
+    def write(self, tmp, name, content):
+        path = os.path.join(tmp, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        return path
+
+    def test_csv_upserts_by_sku_and_reports_rejects(self):
+        Product.objects.create(sku="A1", name="Old phone", description="old", price=900)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = self.write(tmp, "feed.csv", (
+                "sku,name,description,price,stock\n"
+                "A1,Phone,Smart phone,1000,5\n"
+                "A2,Laptop,Light laptop,abc,\n"
+                "A3,Lamp,Desk lamp,50,\n"
+                ",NoSku,x,1,\n"
+            ))
+            rejects = os.path.join(tmp, "rejects.jsonl")
+            out = io.StringIO()
+            call_command("import_products", source, batch_size=1, rejects=rejects, stdout=out)
+            with open(rejects, encoding="utf-8") as fh:
+                rejected = [json.loads(line) for line in fh]
+
+        self.assertIn("2 محصول", out.getvalue())
+        self.assertEqual([r["row"]["name"] for r in rejected], ["Laptop", "NoSku"])
+        self.assertEqual(Product.objects.count(), 2)
+        phone = Product.objects.get(sku="A1")
+        self.assertEqual((phone.name, phone.price, phone.stock), ("Phone", 1000, 5))
+        self.assertIsNone(Product.objects.get(sku="A3").stock)
+
+    def test_jsonl_duplicates_in_batch_keep_last_and_are_searchable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = self.write(tmp, "feed.jsonl", "\n".join([
+                json.dumps({"sku": "B1", "name": "Camera", "description": "Digital camera", "price": 10}),
+                "not json",
+                json.dumps({"sku": "B1", "name": "Camera Pro", "description": "Digital camera", "price": 20}),
+            ]))
+            call_command("import_products", source, stdout=io.StringIO())
+
+        product = Product.objects.get(sku="B1")
+        self.assertEqual((product.name, product.price), ("Camera Pro", 20))
+        self.assertEqual(search_product_ids("camera", limit=10)[0][0], product.id)
+
+
+class OrderExportTests(TestCase):
+    """
+    خروجی جریانی سفارش‌ها از دستور مدیریتی و action ادمین
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="12345")
+        self.pen = Product.objects.create(name="Pen", description="Blue pen", price=15)
+        self.book = Product.objects.create(name="Book", description="Novel", price=100)
+
+        self.paid = Order.objects.create(user=self.user, status="paid")
+        OrderItem.objects.create(order=self.paid, product=self.pen, quantity=2, price=15)
+        OrderItem.objects.create(order=self.paid, product=self.book, quantity=1, price=100)
+        self.pending = Order.objects.create(user=self.user, status="pending")
+        OrderItem.objects.create(order=self.pending, product=self.pen, quantity=1, price=15)
+        self.old = Order.objects.create(user=self.user, status="paid")
+        Order.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+    def test_command_filters_by_status_and_date(self):
+        out = io.StringIO()
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        call_command("export_orders", status=["paid"], since=since, chunk_size=1, stdout=out)
+
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual({row["order_id"] for row in rows}, {str(self.paid.id)})
+        self.assertEqual([row["product_name"] for row in rows], ["Pen", "Book"])
+        self.assertEqual(rows[0]["order_total"], "130")
+        self.assertEqual(rows[0]["line_total"], "30")
+
+    def test_command_jsonl_queries_do_not_grow_with_orders(self):
+        out = io.StringIO()
+        # یک کوئری برای سفارش‌ها و یک کوئری prefetch برای هر تکه
+        with self.assertNumQueries(2):
+            call_command("export_orders", format="jsonl", stdout=out)
+
+        orders = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([o["id"] for o in orders], [self.paid.id, self.pending.id, self.old.id])
+        self.assertEqual(orders[0]["total"], 130)
+        self.assertEqual(len(orders[0]["items"]), 2)
+        self.assertEqual(orders[2]["items"], [])
+
+    def test_admin_action_streams_selected_orders(self):
+        admin_user = User.objects.create_superuser(username="boss", email="boss@example.com", password="12345")
+        self.client.force_login(admin_user)
+
+        response = self.client.post(reverse("admin:auth_app_order_changelist"), {
+            "action": "export_csv",
+            "_selected_action": [self.pending.id],
+        })
+
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([(row["order_id"], row["quantity"]) for row in rows], [(str(self.pending.id), "1")])
+
+
+class SalesRollupTests(TestCase):
+    """
+    جمع فروش روزانه با ثبت سفارش، تغییر وضعیت و ویرایش اقلام به‌روز می‌ماند
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="seller", password="12345")
+        self.pen = Product.objects.create(name="Pen", description="Blue pen", price=15)
+        self.book = Product.objects.create(name="Book", description="Novel", price=100)
+        self.today = timezone.localdate()
+
+    def rollup(self):
+        return {
+            row.product_id: (row.units, row.revenue, row.orders)
+            for row in DailySales.objects.filter(day=self.today)
+        }
+
+    def checkout(self, cart):
+        self.client.force_login(self.user)
+        store = for_user(self.user)
+        for product_id, quantity in cart.items():
+            store.set(product_id, quantity)
+        self.client.get(reverse("checkout"))
+        return Order.objects.filter(user=self.user).latest("id")
+
+    def test_checkout_adds_to_rollup(self):
+        self.checkout({self.pen.id: 2, self.book.id: 1})
+        self.checkout({self.pen.id: 1})
+
+        self.assertEqual(self.rollup(), {self.pen.id: (3, 45, 2), self.book.id: (1, 100, 1)})
+
+    def test_status_change_retracts_and_restores(self):
+        order = self.checkout({self.pen.id: 2})
+
+        order.status = "cancelled"
+        order.save()
+        self.assertEqual(self.rollup(), {self.pen.id: (0, 0, 0)})
+
+        order.status = "paid"
+        order.save()
+        self.assertEqual(self.rollup(), {self.pen.id: (2, 30, 1)})
+
+    def test_item_edits_and_order_delete(self):
+        order = self.checkout({self.pen.id: 2})
+
+        item = order.items.get()
+        item.quantity = 5
+        item.save()
+        OrderItem.objects.create(order=order, product=self.book, quantity=1, price=100)
+        self.assertEqual(self.rollup(), {self.pen.id: (5, 75, 1), self.book.id: (1, 100, 1)})
+
+        order.delete()
+        self.assertEqual(self.rollup(), {self.pen.id: (0, 0, 0), self.book.id: (0, 0, 0)})
+
+    def test_rebuild_matches_incremental(self):
+        self.checkout({self.pen.id: 2, self.book.id: 1})
+        cancelled = self.checkout({self.book.id: 3})
+        cancelled.status = "cancelled"
+        cancelled.save()
+        incremental = self.rollup()
+
+        call_command("rebuild_sales", stdout=io.StringIO())
+
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_rebuild_fixes_each_day_in_its_own_transaction(self):
+        old = self.checkout({self.pen.id: 2})
+        yesterday = self.today - timedelta(days=1)
+        Order.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=1))
+        DailySales.objects.update(units=99)
+        DailySales.objects.create(day=yesterday - timedelta(days=1), product=self.book, units=1)
+        depth = len(connection.atomic_blocks)
+
+        rebuilt = []
+        for day in sales.rebuild():
+            # بین روزها تراکنشی باز نیست و ثبت سفارش منتظر نمی‌ماند
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            if not rebuilt:
+                self.checkout({self.book.id: 1})
+            rebuilt.append(day)
+
+        self.assertEqual(rebuilt, [yesterday - timedelta(days=1), yesterday, self.today])
+        self.assertEqual(
+            {(row.day, row.product_id): row.units for row in DailySales.objects.all()},
+            {(yesterday, self.pen.id): 2, (self.today, self.book.id): 1},
+        )
+
+    def test_failed_rebuild_keeps_previous_totals(self):
+        self.checkout({self.pen.id: 2})
+        self.checkout({self.book.id: 1})
+        before = self.rollup()
+
+        with mock.patch("auth_app.sales.add_rows", side_effect=RuntimeError("boom")), self.assertRaises(RuntimeError):
+            call_command("rebuild_sales", stdout=io.StringIO())
+
+        self.assertEqual(self.rollup(), before)
+
+    def test_admin_dashboard_reads_rollup(self):
+        self.checkout({self.pen.id: 2, self.book.id: 1})
+        admin_user = User.objects.create_superuser(username="boss", email="boss@example.com", password="12345")
+        self.client.force_login(admin_user)
+
+        response = self.client.get(reverse("admin:auth_app_dailysales_changelist"))
+
+        self.assertContains(response, "پرفروش‌ترین محصولات")
+        self.assertEqual(response.context["sales_total"]["revenue"], 130)
+        self.assertEqual(response.context["top_products"][0]["product__name"], "Book")
+
+
+def _run_worker():
+    out = io.StringIO()
+    # مثل کلاینت تست: بستن اتصال داخل تراکنش TestCase آن را خراب می‌کند
+    with mock.patch("auth_app.management.commands.run_worker.close_old_connections"):
+        call_command("run_worker", once=True, stdout=out)
+    return out.getvalue()
+
+
+_flaky_calls = []
+
+
+@jobs.task
+def _flaky_task(fail):
+    _flaky_calls.append(fail)
+    if fail:
+        raise RuntimeError("downstream unavailable")
+
+
+class JobQueueTests(TestCase):
+    """
+    صف کارهای پس‌زمینه: ثبت در تراکنش checkout، برداشتن، تلاش دوباره با backoff
+    """
+
+    def setUp(self):
+        _flaky_calls.clear()
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="12345")
+        self.product = Product.objects.create(name="Mouse", description="Wireless mouse", price=50)
+
+    def work(self):
+        return _run_worker()
+
+    def test_checkout_enqueues_confirmation_email(self):
+        self.client.force_login(self.user)
+        for_user(self.user).add(self.product.id, 2)
+
+        self.client.get(reverse("checkout"))
+
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get()
+        self.assertEqual(job.name, "auth_app.tasks.send_order_confirmation")
+
+        self.assertIn("1 کار انجام شد", self.work())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        self.assertIn("Mouse × 2: 100", mail.outbox[0].body)
+
+    def test_rolled_back_transaction_drops_job(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            _flaky_task.enqueue(fail=False)
+            raise RuntimeError
+
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        _flaky_task.enqueue(fail=True, max_attempts=2)
+
+        with self.assertLogs("auth_app.jobs", level="WARNING"):
+            self.work()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("downstream unavailable", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+
+        # هنوز زمان تلاش دوباره نرسیده
+        self.work()
+        self.assertEqual(_flaky_calls, [True])
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("auth_app.jobs", level="ERROR"):
+            self.work()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_claim_skips_running_and_future_jobs(self):
+        first = _flaky_task.enqueue(fail=False)
+        _flaky_task.enqueue(fail=False, delay=60)
+
+        self.assertEqual([job.pk for job in jobs.claim("a", limit=5)], [first.pk])
+        self.assertEqual(jobs.claim("b", limit=5), [])
+
+    def test_stale_running_job_is_requeued(self):
+        job = _flaky_task.enqueue(fail=False)
+        jobs.claim("crashed")
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual([claimed.pk for claimed in jobs.claim("b")], [job.pk])
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            jobs.enqueue("auth_app.tasks.missing")
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_waits_for_the_delay(self):
+        ran = threading.Event()
+        with mock.patch.dict(jobs._registry, {"auth_app.tests.mark": lambda: ran.set()}):
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.enqueue("auth_app.tests.mark", delay=0.3)
+            self.assertFalse(ran.is_set())
+            self.assertTrue(ran.wait(5))
+        self.assertFalse(Job.objects.exists())
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite قفل سطری ندارد و برداشتن‌ها پشت سر هم انجام می‌شوند")
+class JobClaimConcurrencyTests(TransactionTestCase):
+    """
+    workerهای هم‌زمان کار قفل‌شده را رد می‌کنند و کار تکراری برنمی‌دارند
+    """
+
+    def test_locked_job_is_skipped(self):
+        first = _flaky_task.enqueue(fail=False)
+        second = _flaky_task.enqueue(fail=False)
+        claimed = []
+
+        def other_worker():
+            try:
+                claimed.extend(job.pk for job in jobs.claim("other", limit=5))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            Job.objects.select_for_update().get(pk=first.pk)
+            thread = threading.Thread(target=other_worker)
+            thread.start()
+            thread.join(10)
+
+        self.assertEqual(claimed, [second.pk])
+
+
+class OrderHistoryTests(TestCase):
+    """
+    تاریخچه سفارش‌های کاربر: جدیدترین اول، صفحه‌بندی keyset و تعداد کوئری ثابت
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="12345")
+        self.other = User.objects.create_user(username="other", password="12345")
+        self.products = [Product.objects.create(name=f"Item {i}", description="desc", price=10) for i in range(3)]
+        self.client.force_login(self.user)
+        # خلاصه سبد navbar مثل بعد از هر تغییر سبد در کش است
+        cache.clear()
+        DatabaseCartStore(self.user).summary()
+
+    def create_orders(self, count, user=None):
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(user=user or self.user, total=0)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=2, price=product.price)
+                for product in self.products
+            ])
+            order.recalculate_total()
+            orders.append(order)
+        return orders
+
+    def page_ids(self, response):
+        return [order.id for order in response.context["orders"]]
+
+    def test_lists_own_orders_newest_first_with_totals(self):
+        mine = self.create_orders(3)
+        self.create_orders(1, user=self.other)
+
+        response = self.client.get(reverse("orders"))
+
+        self.assertEqual(self.page_ids(response), [order.id for order in reversed(mine)])
+        self.assertEqual(response.context["orders"][0].units, 6)
+        self.assertContains(response, "Item 2 × 2")
+        self.assertContains(response, "مجموع: <span class=\"text-success\">60</span>")
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.create_orders(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse("orders"))
+
+        self.create_orders(8)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse("orders"))
+
+        self.assertEqual(len(few), len(many))
+        # session، کاربر، سفارش‌ها، اقلام با محصول
+        self.assertEqual(len(many), 4)
+
+    @override_settings(ORDERS_PER_PAGE=2)
+    def test_keyset_pages_walk_forward_and_back(self):
+        orders = self.create_orders(5)
+        expected = [order.id for order in reversed(orders)]
+
+        seen, response = [], self.client.get(reverse("orders"))
+        while True:
+            seen += self.page_ids(response)
+            if not response.context["next_query"]:
+                break
+            last = response
+            response = self.client.get(f"{reverse('orders')}?{response.context['next_query']}")
+
+        self.assertEqual(seen, expected)
+        back = self.client.get(f"{reverse('orders')}?{response.context['previous_query']}")
+        self.assertEqual(self.page_ids(back), self.page_ids(last))
+
+    def test_detail_shows_only_own_order(self):
+        mine, = self.create_orders(1)
+        theirs, = self.create_orders(1, user=self.other)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("order_detail", args=[mine.id]))
+        self.assertContains(response, "Item 0")
+        self.assertEqual(self.client.get(reverse("order_detail", args=[theirs.id])).status_code, 404)
+
+    def test_requires_login(self):
+        self.client.logout()
+
+        response = self.client.get(reverse("orders"))
+
+        self.assertEqual(response.status_code, 302)
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+    return SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+
+
+class ProductImageTests(TestCase):
+    """
+    ساخت تصاویر کوچک WebP/JPEG با نام مبتنی بر محتوا و نمایش srcset
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name, JOBS_EAGER=True))
+        self.staff = User.objects.create_user(username="staff", password="12345", is_staff=True)
+
+    def create_product(self, image):
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("add_product"), {
+                "name": "Mug", "description": "Coffee mug", "price": 50, "image": image,
+            })
+        self.client.logout()
+        return Product.objects.get(name="Mug")
+
+    def test_upload_generates_hashed_thumbnails(self):
+        product = self.create_product(_png(1200, 600))
+
+        self.assertEqual(product.thumbnails["source"], product.image.name)
+        self.assertEqual((product.thumbnails["width"], product.thumbnails["height"]), (1200, 600))
+        for fmt in ("webp", "jpeg"):
+            self.assertEqual(sorted(product.thumbnails[fmt], key=int), ["200", "400", "800"])
+            for width, name in product.thumbnails[fmt].items():
+                self.assertRegex(name, rf"^products/thumbs/[0-9a-f]{{16}}-{width}\.{fmt}$")
+                with Image.open(os.path.join(self.media.name, name)) as thumb:
+                    self.assertEqual(thumb.size, (int(width), int(width) // 2))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_thumbnails_are_built_by_worker(self):
+        product = self.create_product(_png(400, 200))
+        self.assertEqual(product.thumbnails, {})
+        self.assertEqual(Job.objects.get().payload, {"product_id": product.pk})
+
+        _run_worker()
+
+        product.refresh_from_db()
+        self.assertEqual(sorted(product.thumbnails["webp"], key=int), ["200", "400"])
+
+    def test_small_image_is_not_upscaled(self):
+        product = self.create_product(_png(300, 300))
+        self.assertEqual(sorted(product.thumbnails["jpeg"], key=int), ["200", "300"])
+
+    def test_catalog_renders_lazy_srcset(self):
+        product = self.create_product(_png(1200, 600))
+
+        response = self.client.get(reverse("products"))
+
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, f'{settings.MEDIA_URL}{product.thumbnails["webp"]["800"]} 800w')
+        self.assertNotContains(response, product.image.url)
+
+    def test_thumbnails_are_served_with_far_future_cache(self):
+        product = self.create_product(_png(400, 200))
+
+        response = self.client.get(product.thumbnail_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_clearing_image_clears_thumbnails(self):
+        product = self.create_product(_png(400, 200))
+
+        product.image = ""
+        product.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.thumbnails, {})
+
+
+def _n_plus_one_view(request):
+    for product in Product.objects.all():
+        Product.objects.filter(id=product.id).exists()
+    return HttpResponse("ok")
+
+
+class StaticAssetsTests(TestCase):
+    """
+    CSS از خود سایت (نه CDN) و فقط با کلاس‌هایی که قالب‌ها استفاده می‌کنند
+    """
+
+    def test_pages_link_local_stylesheet(self):
+        Product.objects.create(name="Mug", description="Coffee mug", price=50)
+
+        for url in (reverse("home"), reverse("login"), reverse("register")):
+            response = self.client.get(url)
+            # بعد از collectstatic محلی نام فایل هش هم دارد
+            self.assertRegex(response.content.decode(), r"/static/css/site(\.[0-9a-f]{12})?\.css")
+            self.assertNotContains(response, "cdn.jsdelivr.net")
+
+    def test_storage_uses_manifest_once_collected(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.assertEqual(StaticFilesStorage(location=root).url("css/site.css"), "/static/css/site.css")
+
+        with open(os.path.join(root, "staticfiles.json"), "w") as f:
+            json.dump({"version": "1.1", "paths": {"css/site.css": "css/site.0123456789ab.css"}}, f)
+        storage = StaticFilesStorage(location=root)
+        self.assertEqual(storage.url("css/site.css"), "/static/css/site.0123456789ab.css")
+        with self.assertRaises(ValueError):
+            storage.url("css/missing.css")
+
+    def test_build_css_keeps_only_used_classes(self):
+        output = os.path.join(tempfile.mkdtemp(), "site.css")
+        self.addCleanup(os.remove, output)
+        with mock.patch("auth_app.management.commands.build_css.OUTPUT_CSS", Path(output)):
+            call_command("build_css", stdout=io.StringIO())
+
+        with open(output, encoding="utf-8") as f:
+            css = f.read()
+        self.assertIn("Bootstrap", css)
+        self.assertIn(".btn-success{", css)
+        self.assertIn(".alert-danger{", css)
+        self.assertIn(".site-header", css)
+        self.assertNotIn(".carousel", css)
+        self.assertNotIn("data-bs-theme=dark", css)
+
+    def test_trim_handles_media_queries_and_keyframes(self):
+        from .management.commands.build_css import trim
+
+        css = (
+            ".a,.b{color:red}@media (min-width:1px){.b{x:1}.c .a{x:2}}"
+            ".spin{animation:spin 1s}@keyframes spin{to{x:1}}@keyframes fade{to{x:0}}"
+        )
+
+        self.assertEqual(trim(css, {"a"}), ".a{color:red}")
+        self.assertEqual(
+            trim(css, {"b", "spin"}),
+            ".b{color:red}@media (min-width:1px){.b{x:1}}.spin{animation:spin 1s}@keyframes spin{to{x:1}}",
+        )
+
+
+def _routed_view(request):
+    return HttpResponse(ReplicaRouter().db_for_read(Product))
+
+
+class RoutingUrlconf:
+    urlpatterns = [
+        path("catalog/", replica_reads(_routed_view)),
+        path("other/", _routed_view),
+        path("write/", lambda request: (Product.objects.create(name="New", price=1), _routed_view(request))[1]),
+    ]
+
+
+@override_settings(
+    ROOT_URLCONF=RoutingUrlconf, DATABASE_REPLICAS=["replica_1", "replica_2"], REPLICA_PIN_SECONDS=10,
+)
+class ReplicaRoutingTests(TestCase):
+    """
+    خواندن کاتالوگ از replicaها به نوبت و سنجاق شدن به primary بعد از نوشتن
+    """
+
+    def setUp(self):
+        routers._unhealthy.clear()
+        self.down = set()
+
+        def fake_connection(alias):
+            def ensure_connection():
+                if alias in self.down:
+                    raise DatabaseError("connection refused")
+            # TestCase همه چیز را در تراکنش اجرا می‌کند؛ اینجا مثل درخواست عادی بیرون تراکنشیم
+            return mock.Mock(in_atomic_block=False, ensure_connection=ensure_connection)
+
+        self.enterContext(mock.patch.object(
+            routers, "connections", {alias: fake_connection(alias) for alias in ("default", "replica_1", "replica_2")},
+        ))
+
+    def get(self, url):
+        return self.client.get(url).content.decode()
+
+    def test_catalog_reads_rotate_between_replicas(self):
+        self.assertEqual({self.get("/catalog/"), self.get("/catalog/")}, {"replica_1", "replica_2"})
+
+    def test_other_views_and_code_read_from_primary(self):
+        self.assertEqual(self.get("/other/"), "default")
+        self.assertEqual(ReplicaRouter().db_for_read(Product), "default")
+
+    def test_unhealthy_replica_is_skipped(self):
+        self.down.add("replica_1")
+
+        with self.assertLogs("auth_app.routers", level="WARNING"):
+            routed = {self.get("/catalog/") for _ in range(4)}
+
+        self.assertEqual(routed, {"replica_2"})
+        self.down.add("replica_2")
+        with self.assertLogs("auth_app.routers", level="WARNING"):
+            self.assertEqual(self.get("/catalog/"), "default")
+
+    def test_write_pins_browser_to_primary(self):
+        response = self.client.post("/write/")
+
+        self.assertEqual(response.content.decode(), "default")
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 10)
+        self.assertEqual(self.get("/catalog/"), "default")
+
+        self.client.cookies.pop(settings.REPLICA_PIN_COOKIE)
+        self.assertIn(self.get("/catalog/"), {"replica_1", "replica_2"})
+
+    def test_read_only_request_does_not_pin(self):
+        response = self.client.get("/catalog/")
+
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_product_change_bumps_catalog_again_after_replication_lag(self):
+        # صفحه‌ای که تا REPLICA_PIN_SECONDS از replica عقب‌مانده کش شود، زیر نسخه بعدی نمی‌ماند
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Lamp", price=80)
+        version = catalog.get_version()
+
+        job = Job.objects.get(name="auth_app.catalog.bump_version")
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=9))
+        jobs.run(job)
+        self.assertGreater(catalog.get_version(), version)
+
+
+class SessionUsageTests(TestCase):
+    """
+    مرور مهمان بدون session و حذف batchی sessionهای منقضی
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name="Mug", description="Coffee mug", price=50)
+
+    def test_anonymous_browsing_never_touches_session_table(self):
+        urls = [
+            reverse("home"), reverse("products"), reverse("product_detail", args=[self.product.pk]),
+            reverse("cart"), reverse("add_to_cart", args=[self.product.pk]), reverse("login"), reverse("logout"),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            for url in urls:
+                self.client.get(url)
+
+        self.assertFalse([q["sql"] for q in queries if "django_session" in q["sql"]])
+        self.assertFalse(Session.objects.exists())
+
+    def test_messages_survive_redirect_in_cookie(self):
+        response = self.client.get(reverse("add_to_cart", args=[self.product.pk]), follow=True)
+
+        self.assertContains(response, "باید ثبت‌نام یا وارد شوید")
+        self.assertFalse(Session.objects.exists())
+
+    def test_login_creates_session(self):
+        User.objects.create_user(username="ali", password="12345")
+
+        self.client.post(reverse("login"), {"username": "ali", "password": "12345"})
+
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_purge_deletes_only_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f"old{i}", session_data="", expire_date=now - timedelta(days=1)) for i in range(5)]
+            + [Session(session_key=f"new{i}", session_data="", expire_date=now + timedelta(days=1)) for i in range(2)]
+        )
+        out = io.StringIO()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("purge_sessions", batch_size=2, sleep=0, stdout=out)
+
+        self.assertIn("5 session", out.getvalue())
+        self.assertEqual(set(Session.objects.values_list("session_key", flat=True)), {"new0", "new1"})
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("DELETE")]), 3)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_purge_skips_cookie_sessions(self):
+        out = io.StringIO()
+
+        call_command("purge_sessions", stdout=out)
+
+        self.assertIn("چیزی برای حذف نیست", out.getvalue())
+
+
+class QueryPlanTests(TestCase):
+    """
+    کوئری‌های اصلی سفارش‌ها، اقلام و صف کارها روی داده seed شده نباید به
+    پیمایش کامل جدول (Seq Scan / SCAN) برگردند
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_data", products=50, users=30, order_items=600, items_per_order=3, stdout=io.StringIO(),
+        )
+        cls.user = User.objects.filter(orders__isnull=False).first()
+        for _ in range(5):
+            _flaky_task.enqueue(fail=False)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, *indexes):
+        """
+        plan باید یکی از indexes را به کار ببرد؛ انتخاب بین چند ایندکس مناسب با planner است.
+        """
+        plan = _query_plan(queryset)
+        table = queryset.model._meta.db_table
+        # SQLite: «SCAN جدول» بدون USING یعنی پیمایش کامل؛ PostgreSQL: «Seq Scan on جدول»
+        self.assertNotRegex(plan, rf"Seq Scan on {table}\b|SCAN {table}\b(?! USING)")
+        self.assertTrue(any(index in plan for index in indexes), plan)
+
+    def test_order_history_page(self):
+        self.assertUsesIndex(
+            Order.objects.filter(user=self.user).order_by("-created_at", "-id")[:10], "order_user_created_idx",
+        )
+
+    def test_admin_status_filter_newest_first(self):
+        self.assertUsesIndex(
+            Order.objects.filter(status="paid").order_by("-created_at")[:100], "order_status_created_idx",
+        )
+
+    def test_export_status_and_date_range(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(
+            Order.objects.filter(status__in=["pending", "paid"], created_at__gte=since),
+            "order_status_created_idx", "order_created_idx",
+        )
+
+    def test_date_range_without_status(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(Order.objects.filter(created_at__gte=since), "order_created_idx")
+
+    def test_admin_changelist_ordering(self):
+        self.assertUsesIndex(Order.objects.order_by("-created_at")[:100], "order_created_idx")
+
+    def test_order_items_prefetch(self):
+        order_ids = list(Order.objects.values_list("id", flat=True)[:10])
+        self.assertUsesIndex(OrderItem.objects.filter(order_id__in=order_ids), "order_id")
+
+    def test_job_claim(self):
+        queued = Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).order_by("run_at")[:10]
+        self.assertUsesIndex(queued, "job_queued_run_at_idx")
+
+
+class TimingUrlconf:
+    urlpatterns = [path("n-plus-one/", _n_plus_one_view)]
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+class RequestTimingMiddlewareTests(TestCase):
+    """
+    هدر Server-Timing، لاگ درخواست‌های کند و نمونه‌برداری
+    """
+
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            Product.objects.create(name=f"Item {i}", description="desc", price=10)
+        self.staff = User.objects.create_user(username="ops", password="12345", is_staff=True)
+
+    def server_timing(self, response):
+        return dict(part.strip().split(";", 1) for part in response["Server-Timing"].split(","))
+
+    @override_settings(ROOT_URLCONF=TimingUrlconf, DEBUG=True)
+    def test_header_reports_query_count(self):
+        response = self.client.get("/n-plus-one/")
+
+        metrics = self.server_timing(response)
+        self.assertIn("dur=", metrics["app"])
+        self.assertIn('desc="4 queries"', metrics["db"])
+
+    @override_settings(ROOT_URLCONF=TimingUrlconf, SLOW_REQUEST_MS=0)
+    def test_header_is_only_shown_to_staff_outside_debug(self):
+        with self.assertLogs("auth_app.timing", level="WARNING"):
+            response = self.client.get("/n-plus-one/")
+        self.assertNotIn("Server-Timing", response)
+
+        self.client.force_login(self.staff)
+        with self.assertLogs("auth_app.timing", level="WARNING"):
+            response = self.client.get("/n-plus-one/")
+        self.assertIn("db", self.server_timing(response))
+
+    @override_settings(ROOT_URLCONF=TimingUrlconf, SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_repeated_queries(self):
+        with self.assertLogs("auth_app.timing", level="WARNING") as logs:
+            self.client.get("/n-plus-one/")
+
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertIn("4 queries", message)
+        self.assertIn("3x SELECT", message)
+
+    @override_settings(ROOT_URLCONF=TimingUrlconf, REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.get("/n-plus-one/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(ROOT_URLCONF=AsyncUrlconf, CATALOG_PAGE_CACHE=False)
+    async def test_async_view_queries_are_counted(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse("products"))
+
+        self.assertContains(response, "Item 0")
+        self.assertNotIn('desc="0 queries"', self.server_timing(response)["db"])
@@ -0,0 +1,118 @@
+"""
+محدودیت تلاش‌های ورود و ثبت‌نام با شمارنده‌های پنجره لغزان در کش.
+
+شمارنده‌ها باید در کش مشترک بین workerها باشند (CACHES در settings)؛ با کش
+داخل حافظه هر worker جدا می‌شمارد و سقف عملا در تعداد workerها ضرب می‌شود.
+"""
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .backends import resolve_login
+
+
+logger = logging.getLogger("auth_app.throttle")
+
+BLOCKED_KEY = "throttle:blocked:{}:{}"
+
+
+def client_ip(request):
+    # پشت پروکسی، آخرین آدرس X-Forwarded-For همان است که پروکسی خودمان دیده
+    value = request.META.get(settings.CLIENT_IP_HEADER) or request.META.get("REMOTE_ADDR", "")
+    return value.split(",")[-1].strip()
+
+
+def account_ident(login, request=None):
+    """
+    شناسه حساب برای شمارنده ورود: با نام کاربری و ایمیل (با هر حروف بزرگ/کوچکی)
+    یک شمارنده مشترک دارد؛ login ناشناخته با شکل نرمال‌شده خودش شمرده می‌شود.
+    کاربر پیداشده روی request می‌ماند و authenticate دوباره آن را جست‌وجو نمی‌کند.
+    """
+    login = login.strip()
+    user = resolve_login(login, request) if login else None
+    return f"user:{user.pk}" if user else login.upper()
+
+
+def _key(name, scope, ident, bucket):
+    digest = hashlib.sha256(str(ident).encode()).hexdigest()[:32]
+    return f"throttle:{name}:{scope}:{digest}:{bucket}"
+
+
+def _rules(name):
+    return getattr(settings, f"{name.upper()}_THROTTLE")
+
+
+def _window_keys(name, scope, ident, window, now):
+    bucket = int(now // window)
+    return _key(name, scope, ident, bucket), _key(name, scope, ident, bucket - 1)
+
+
+def _count(name, idents, now):
+    """
+    تعداد تلاش‌ها در پنجره لغزان هر scope؛ پنجره قبلی به نسبت زمان باقی‌مانده‌اش
+    حساب می‌شود (دو شمارنده به جای نگه‌داشتن زمان تک‌تک تلاش‌ها). جمع رو به بالا
+    گرد می‌شود تا نزدیک مرز پنجره ۲.۹۸ تلاش زیر سقف ۳ حساب نشود.
+    """
+    keys = {}
+    for scope, (limit, window) in _rules(name).items():
+        if idents.get(scope):
+            keys[scope] = _window_keys(name, scope, idents[scope], window, now)
+
+    values = cache.get_many([key for pair in keys.values() for key in pair])
+    counts = {}
+    for scope, (current, previous) in keys.items():
+        window = _rules(name)[scope][1]
+        weight = 1 - (now % window) / window
+        counts[scope] = math.ceil(values.get(current, 0) + values.get(previous, 0) * weight)
+    return counts
+
+
+def blocked(name, idents):
+    """
+    اگر یکی از شمارنده‌ها به سقف رسیده باشد نام آن scope را برمی‌گرداند، وگرنه None.
+    فقط از کش می‌خواند؛ قبل از هش رمز صدا زده می‌شود.
+    """
+    rules = _rules(name)
+    for scope, count in _count(name, idents, time.time()).items():
+        if count >= rules[scope][0]:
+            _incr(BLOCKED_KEY.format(name, scope), None)
+            logger.info("%s throttled by %s (%d attempts)", name, scope, count)
+            return scope
+    return None
+
+
+def hit(name, idents):
+    now = time.time()
+    for scope, (limit, window) in _rules(name).items():
+        if idents.get(scope):
+            current, _ = _window_keys(name, scope, idents[scope], window, now)
+            # کلید بعد از دو پنجره خودش از کش حذف می‌شود
+            _incr(current, window * 2)
+
+
+def reset(name, scope, ident):
+    now = time.time()
+    window = _rules(name)[scope][1]
+    cache.delete_many(_window_keys(name, scope, ident, window, now))
+
+
+def _incr(key, timeout):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout):
+            cache.incr(key)
+
+
+def stats():
+    keys = {
+        f"{name}:{scope}": BLOCKED_KEY.format(name, scope)
+        for name in ("login", "register")
+        for scope in _rules(name)
+    }
+    values = cache.get_many(list(keys.values()))
+    return {label: values.get(key, 0) for label, key in keys.items()}
@@ -1,16 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# روی ASGI نسخه async viewهای فقط‌خواندنی استفاده می‌شود
+read_views = async_views if settings.ASYNC_CATALOG_VIEWS else views
 
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', read_views.home, name='home'),
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
     path('logout/', views.logout, name='logout'),
-    path('products/', views.products, name='products'),
-    path('products/<int:pk>/',views.ProductDetail,name='product_detail'),
-    path('cart/', views.cart, name='cart'),
+    path('products/', read_views.products, name='products'),
+    path('products/search/', views.product_search, name='product_search'),
+    path('products/<int:pk>/',read_views.ProductDetail,name='product_detail'),
+    path('cart/', read_views.cart, name='cart'),
     path('add_to_cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('remove_from_cart/<int:product_id>/', views.remove_from_cart, name='remove_from_cart'),
     path("add-product/", views.add_product, name="add_product"),
     path('checkout/', views.checkout, name='checkout'),
+    path('orders/', views.orders, name='orders'),
+    path('orders/<int:pk>/', views.order_detail, name='order_detail'),
+    path('api/products/', api.products, name='api_products'),
+    path('api/cart/', api.cart, name='api_cart'),
+    path('api/cart/batch/', api.cart_batch, name='api_cart_batch'),
 ]
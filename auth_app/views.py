@@ -1,39 +1,87 @@
 from django.shortcuts import render, redirect ,get_object_or_404
+from django.http import Http404
 from django.contrib import messages
 from django.contrib.auth import login as auth_login, logout as auth_logout 
 from .forms import RegisterForm, EmailAuthenticationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, redirect
 from .forms import ProductForm
+from django.db import transaction
+from django.db.models import Prefetch, Sum
 from django.urls import reverse
 from urllib.parse import urlencode
 from .models import Product, Order, OrderItem
+from . import catalog, sales, tasks, throttle
+from .cart_store import get_cart
+from .pagination import paginate_keyset
+from .search import search_products
+from .routers import replica_reads
+from .images import THUMBNAIL_DIR
+from django.conf import settings
+from django.views.static import serve
 
 
 
 
 @login_required
 def checkout(request):
-    cart = request.session.get("cart", {})
+    store = get_cart(request)
+    cart = store.lines()
     if not cart:
         messages.warning(request, "سبد خرید شما خالی است.")
         return redirect("cart")
 
-    products = Product.objects.filter(id__in=cart.keys())
+    with transaction.atomic():
+        products = Product.objects.in_bulk(list(cart))
+        stale = [pid for pid in cart if pid not in products]
+        wanted = {pid: cart[pid] for pid in products if cart[pid] > 0}
 
-    order = Order.objects.create(user=request.user, status="pending")
+        # موجودی با یک UPDATE شرطی کم می‌شود؛ ردیفی که موجودی کافی ندارد رد می‌شود
+        remaining = Product.objects.reserve_stock({
+            pid: quantity for pid, quantity in wanted.items() if products[pid].stock is not None
+        })
+        rejected = [pid for pid in wanted if products[pid].stock is not None and pid not in remaining]
+
+        items = [
+            OrderItem(product=products[pid], quantity=quantity, price=products[pid].price)
+            for pid, quantity in wanted.items()
+            if pid not in rejected
+        ]
+
+        if not items:
+            # شناسه‌های محصولات حذف‌شده را از سبد پاک می‌کنیم
+            store.remove(stale)
+            if rejected:
+                messages.warning(request, "موجودی محصولات سبد خرید شما کافی نیست.")
+            else:
+                messages.warning(request, "محصولات سبد خرید شما دیگر موجود نیستند.")
+            return redirect("cart")
+
+        order = Order.objects.create(
+            user=request.user,
+            status="pending",
+            total=sum(item.total_price for item in items),
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        # bulk_create سیگنال نمی‌فرستد؛ جمع فروش روزانه همین‌جا به‌روز می‌شود
+        sales.add_items(sales.order_day(order), items)
+        # ایمیل بیرون از درخواست فرستاده می‌شود؛ اگر تراکنش برگردد کار هم ثبت نمی‌شود
+        tasks.send_order_confirmation.enqueue(order_id=order.id)
 
-    for p in products:
-        qty = cart.get(str(p.id), 0)
-        if qty > 0:
-            OrderItem.objects.create(
-                order=order,
-                product=p,
-                quantity=qty,
-                price=p.price,
-            )
 #pak kardan sabad kharid bad az  kharid
-    request.session["cart"] = {}
+        store.remove([item.product_id for item in items] + stale)
+
+        if 0 in remaining.values():
+            # محصولی ناموجود شد؛ صفحه‌های کش‌شده کاتالوگ باید به‌روز شوند
+            catalog.invalidate()
+
+    if stale:
+        messages.warning(request, "برخی از محصولات سبد خرید دیگر موجود نبودند و حذف شدند.")
+    if rejected:
+        names = "، ".join(products[pid].name for pid in rejected)
+        messages.warning(request, f"موجودی این محصولات کافی نبود و در سبد خرید ماندند: {names}")
     messages.success(request, f"سفارش شما ثبت شد. کد سفارش: {order.id}")
     return redirect("home")
 
@@ -46,7 +94,7 @@ def is_admin(user):
 @user_passes_test(is_admin)
 def add_product(request):
     if request.method == "POST":
-        form = ProductForm(request.POST)
+        form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
             form.save()
             return redirect("home")
@@ -56,9 +104,18 @@ def add_product(request):
     return render(request, "add_product.html", {"form": form})
 
 
+def _catalog_context(request):
+    sort, after, before = catalog.catalog_params(request.GET)
+    return {
+        "sort": sort,
+        "catalog_html": catalog.render_product_grid(sort, after=after, before=before),
+    }
+
+
+@replica_reads
+@catalog.cache_anonymous_page
 def home(request):
-    products = Product.objects.all()
-    return render(request, 'auth_app/home.html', {'products': products})
+    return render(request, 'auth_app/home.html', _catalog_context(request))
 
 
 def register(request):
@@ -66,6 +123,13 @@ def register(request):
         return redirect("home")
 
     if request.method == "POST":
+        idents = {"ip": throttle.client_ip(request)}
+        if throttle.blocked("register", idents):
+            messages.error(request, "تعداد درخواست‌های ثبت‌نام زیاد است. کمی بعد دوباره تلاش کنید.")
+            form = RegisterForm(initial={"username": request.POST.get("username"), "email": request.POST.get("email")})
+            return render(request, "register.html", {"form": form}, status=429)
+        throttle.hit("register", idents)
+
         form = RegisterForm(request.POST)
         if form.is_valid():
             form.save()
@@ -86,13 +150,25 @@ def login(request):
     next_url = request.GET.get("next") or request.POST.get("next") or "home"
 
     if request.method == "POST":
+        # قبل از هش رمز (یک کوئری ایندکس‌دار و خواندن از کش)؛ تا سیل تلاش‌های ناموفق CPU را نگیرد
+        idents = {
+            "ip": throttle.client_ip(request),
+            "account": throttle.account_ident(request.POST.get("username", ""), request),
+        }
+        if throttle.blocked("login", idents):
+            messages.error(request, "تعداد تلاش‌های ناموفق زیاد است. چند دقیقه بعد دوباره تلاش کنید.")
+            form = EmailAuthenticationForm(initial={"username": request.POST.get("username", "")})
+            return render(request, "login.html", {"form": form, "next": next_url}, status=429)
+
         form = EmailAuthenticationForm(request, data=request.POST)
         if form.is_valid():
             user = form.get_user()
+            throttle.reset("login", "account", idents["account"])
             auth_login(request, user)
             messages.success(request, "با موفقیت وارد شدید.")
             return redirect(next_url)
         else:
+            throttle.hit("login", idents)
             messages.error(request, "ورود ناموفق بود. اطلاعات را بررسی کنید.")
     else:
         form = EmailAuthenticationForm()
@@ -106,23 +182,51 @@ def logout(request):
     return redirect("home")
 
 
+@replica_reads
+@catalog.cache_anonymous_page
 def products(request):
-    products = Product.objects.all()
-    return render(request, 'auth_app/home.html', {'products': products})
+    return render(request, 'auth_app/home.html', _catalog_context(request))
 
 
+def product_search(request):
+    query = request.GET.get("q", "").strip()
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    results, has_next = search_products(query, page=page) if query else ([], False)
+
+    next_query = previous_query = None
+    if has_next:
+        next_query = urlencode({"q": query, "page": page + 1})
+    if page > 1:
+        previous_query = urlencode({"q": query, "page": page - 1})
+
+    return render(request, 'auth_app/home.html', {
+        "products": results,
+        "query": query,
+        "next_query": next_query,
+        "previous_query": previous_query,
+    })
+
+
+@replica_reads
+@catalog.cache_anonymous_page
 def ProductDetail(request,pk):
-    product = get_object_or_404(Product,pk=pk)
+    product = catalog.get_product(pk)
+    if product is None:
+        raise Http404("محصول پیدا نشد.")
     return render(request,'auth_app/detail.html',{'product':product})
 
 
 def cart(request):
-    cart_items = request.session.get('cart', {})
+    cart_items = get_cart(request).lines()
     products = Product.objects.filter(id__in=cart_items.keys())
     cart_details = []
 
     for product in products:
-        quantity = cart_items[str(product.id)]
+        quantity = cart_items[product.id]
         total_price = product.price * quantity
         cart_details.append({
             'product': product,
@@ -141,15 +245,11 @@ def add_to_cart(request, product_id):
         next_url = request.META.get("HTTP_REFERER") or reverse("home")
         return redirect(f"{login_url}?{urlencode({'next': next_url})}")
 
-    cart = request.session.get('cart', {})
-    product_id_str = str(product_id)
-
-    if product_id_str in cart:
-        cart[product_id_str] += 1
-    else:
-        cart[product_id_str] = 1
+    product = catalog.get_product(product_id)
+    if product is None:
+        raise Http404("محصول پیدا نشد.")
 
-    request.session['cart'] = cart
+    get_cart(request).add(product_id, price=product.price)
     messages.success(request, "محصول به سبد خرید اضافه شد.")
 
     return redirect(request.META.get("HTTP_REFERER") or "products")
@@ -157,12 +257,47 @@ def add_to_cart(request, product_id):
 
 
 def remove_from_cart(request, product_id):
-    cart = request.session.get('cart', {})
-    product_id_str = str(product_id)
-
-    if product_id_str in cart:
-        del cart[product_id_str]
-        request.session['cart'] = cart
+    if get_cart(request).remove([product_id]):
         messages.success(request, "محصول از سبد خرید حذف شد.")
 
     return redirect('cart')
+
+
+# جدیدترین اول؛ id برای یکتا بودن ترتیب سفارش‌های هم‌زمان
+ORDER_HISTORY_ORDERING = ("-created_at", "-id")
+
+
+def _orders_with_items(user):
+    # اقلام و محصولاتشان با یک کوئری (JOIN)، نه یکی برای اقلام و یکی برای محصولات
+    items = OrderItem.objects.select_related("product").order_by("id")
+    return Order.objects.filter(user=user).prefetch_related(Prefetch("items", queryset=items))
+
+
+@login_required
+def orders(request):
+    page = paginate_keyset(
+        _orders_with_items(request.user).annotate(units=Sum("items__quantity")),
+        ORDER_HISTORY_ORDERING,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        per_page=settings.ORDERS_PER_PAGE,
+    )
+    return render(request, "auth_app/orders.html", {
+        "orders": page.object_list,
+        "next_query": urlencode({"after": page.next_cursor}) if page.has_next else None,
+        "previous_query": urlencode({"before": page.previous_cursor}) if page.has_previous else None,
+    })
+
+
+@login_required
+def order_detail(request, pk):
+    order = get_object_or_404(_orders_with_items(request.user), pk=pk)
+    return render(request, "auth_app/order_detail.html", {"order": order})
+
+
+def media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(THUMBNAIL_DIR + "/"):
+        # نام تصاویر کوچک از محتوایشان ساخته شده و هرگز تغییر نمی‌کنند
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
@@ -0,0 +1,150 @@
+"""
+مقایسه throughput و تاخیر (p50/p95/p99) کاتالوگ روی gunicorn (WSGI، viewهای
+sync) و uvicorn (ASGI، viewهای async) زیر بار هم‌زمان، روی دیتابیس محلی.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python manage.py migrate
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/asgi_vs_wsgi.py --concurrency 64 --duration 20
+
+نیازمند gunicorn و uvicorn است. خروجی JSON روی stdout (یا --output) چاپ می‌شود.
+برای سنجیدن مسیر رندر به جای کش صفحه مهمان‌ها، CATALOG_PAGE_CACHE=0 بگذارید.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    "wsgi": {
+        "command": ["gunicorn", "shop.wsgi:application", "--bind", "127.0.0.1:{port}", "--workers", "{workers}",
+                    "--threads", "1", "--log-level", "warning"],
+        "env": {"ASYNC_CATALOG_VIEWS": "0"},
+    },
+    "asgi": {
+        "command": ["uvicorn", "shop.asgi:application", "--host", "127.0.0.1", "--port", "{port}",
+                    "--workers", "{workers}", "--log-level", "warning", "--no-access-log"],
+        "env": {"ASYNC_CATALOG_VIEWS": "1", "CONN_MAX_AGE": "0"},
+    },
+}
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return round(values[index], 2)
+
+
+def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def run_load(port, paths, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, failed, i = [], 0, offset
+        while time.monotonic() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+    }
+
+
+def benchmark(name, args):
+    spec = SERVERS[name]
+    command = [part.format(port=args.port, workers=args.workers) for part in spec["command"]]
+    env = {**os.environ, **spec["env"], "DJANGO_SETTINGS_MODULE": "shop.settings"}
+
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    try:
+        wait_for_server(args.port)
+        run_load(args.port, args.paths, args.concurrency, min(args.duration, 3))  # warm-up
+        return run_load(args.port, args.paths, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["wsgi", "asgi"])
+    parser.add_argument("--paths", nargs="+", default=["/", "/products/", "/products/?sort=price"])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=int, default=15, help="seconds per server")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "workers": args.workers,
+        "paths": args.paths,
+        "results": {name: benchmark(name, args) for name in args.servers},
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+زمان پیدا کردن کاربر در مسیر ورود (نام کاربری یا ایمیل) روی دیتابیس محلی:
+جستجوی قبلی (email= و بعد username=، بدون ایندکس) در برابر
+auth_app.backends.users_by_login (یک کوئری روی ایندکس‌های UPPER)، همراه با EXPLAIN.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python manage.py seed_data --users 100000
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/login_lookup.py --lookups 2000
+
+با --authenticate کل authenticate() هم اندازه‌گیری می‌شود (که بیشترش هش رمز است).
+رمز کاربران seed_data کلمه password است.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shop.settings")
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return round(values[index], 3)
+
+
+def measure(func, logins):
+    latencies = []
+    for login in logins:
+        started = time.perf_counter()
+        func(login)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "lookups": len(latencies),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--authenticate", action="store_true", help="also time the full authenticate() call")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.contrib.auth import authenticate
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from auth_app.backends import users_by_login
+
+    rng = random.Random(args.seed)
+    users = list(User.objects.exclude(email="").values_list("username", "email")[:50_000])
+    if not users:
+        raise SystemExit("no users; run manage.py seed_data first")
+    # نیمی با ایمیل، نیمی با نام کاربری و بخشی با حروف بزرگ
+    logins = []
+    for _ in range(args.lookups):
+        username, email = rng.choice(users)
+        login = rng.choice([username, email])
+        logins.append(login.upper() if rng.random() < 0.2 else login)
+
+    def legacy(login):
+        user = User.objects.filter(email=login).first()
+        return User.objects.filter(username=user.username if user else login).first()
+
+    results = {
+        "vendor": connection.vendor,
+        "users": User.objects.count(),
+        "legacy_lookup": measure(legacy, logins),
+        "indexed_lookup": measure(lambda login: list(users_by_login(login)), logins),
+        "plan": users_by_login(logins[0]).explain(),
+    }
+    if args.authenticate:
+        results["authenticate"] = measure(
+            lambda login: authenticate(username=login, password=args.password), logins[:50],
+        )
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,9 @@
 #!/usr/bin/env bash
 set -o errexit
 
+# فقط build؛ وب و worker صف کارها (run_worker) دو پروسه جدا هستند، Procfile را ببینید
+
 pip install -r requirements.txt
+python manage.py build_css
 python manage.py collectstatic --noinput
 python manage.py migrate
\ No newline at end of file
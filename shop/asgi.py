@@ -3,6 +3,17 @@ ASGI config for shop project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving with uvicorn and the async catalog views (auth_app.async_views)::
+
+    ASYNC_CATALOG_VIEWS=1 CONN_MAX_AGE=0 uvicorn shop.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+With ASYNC_CATALOG_VIEWS=1 the read paths (home, products, product_detail,
+cart) run natively on the event loop using the async ORM and cache APIs; the
+remaining views are still sync and run in the thread pool. Keep CONN_MAX_AGE
+at 0 under ASGI, since each request may use a different thread; it already
+defaults to 0 when ASYNC_CATALOG_VIEWS is set.
+benchmarks/asgi_vs_wsgi.py compares this setup against gunicorn/WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
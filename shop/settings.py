@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -22,7 +23,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-u8i@*8%%@fwn#j03yxc1c%&+y(66#blw&v!q!r#6h!m0r@e#@0'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "1") == "1"
 
 ALLOWED_HOSTS = []
 
@@ -40,7 +41,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auth_app.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'auth_app.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'auth_app.context_processors.cart',
             ],
         },
     },
@@ -68,16 +73,49 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'shop.wsgi.application'
 
+ASGI_APPLICATION = 'shop.asgi.application'
+
+# روی سرور ASGI (uvicorn) viewهای فقط‌خواندنی کاتالوگ async اجرا شوند
+ASYNC_CATALOG_VIEWS = os.environ.get("ASYNC_CATALOG_VIEWS", "0") == "1"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-import os
 import dj_database_url
+
+# اتصال‌ها بین درخواست‌ها باز می‌مانند و قبل از استفاده دوباره بررسی می‌شوند.
+# زیر ASGI (که هر درخواست ممکن است thread دیگری بگیرد) اتصال ماندگار برای هر thread
+# جدا باز می‌ماند و بسته نمی‌شود؛ پس با ASYNC_CATALOG_VIEWS پیش‌فرض 0 است.
+CONN_MAX_AGE = int(os.environ.get("CONN_MAX_AGE", "0" if ASYNC_CATALOG_VIEWS else "60"))
+
 DATABASES = {
-    "default": dj_database_url.config(default= os.environ.get('DATABASE_URL'))
+    "default": dj_database_url.config(
+        default=os.environ.get('DATABASE_URL'), conn_max_age=CONN_MAX_AGE, conn_health_checks=True,
+    )
 }
 
+# replicaهای فقط‌خواندنی کاتالوگ، با کاما جدا شده؛ auth_app.routers را ببینید
+for index, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), 1):
+    DATABASES[f"replica_{index}"] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=CONN_MAX_AGE, conn_health_checks=True),
+        "TEST": {"MIRROR": "default"},
+    }
+
+for database in DATABASES.values():
+    if database.get("ENGINE") == "django.db.backends.sqlite3":
+        # در SQLite محلی نوشتن‌های هم‌زمان به جای خطای "database is locked" صف می‌شوند
+        database.setdefault("OPTIONS", {}).update({"transaction_mode": "IMMEDIATE", "timeout": 20})
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["auth_app.routers.ReplicaRouter"]
+DATABASE_REPLICA_MODELS = ["auth_app.Product"]
+# replica ناسالم تا این مدت دوباره امتحان نمی‌شود
+REPLICA_RETRY_SECONDS = 30
+# بعد از نوشتن، مرورگر این مدت فقط از primary می‌خواند (باید از تاخیر replication بیشتر باشد)
+REPLICA_PIN_COOKIE = "db_pin"
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -100,7 +138,6 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
-STATIC_URL = 'static/'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -111,10 +148,150 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # -----------------------------
 # AUTH SETTINGS
 # -----------------------------
+AUTHENTICATION_BACKENDS = ["auth_app.backends.EmailOrUsernameBackend"]
+
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
+# محدودیت تلاش‌های ورود/ثبت‌نام در پنجره لغزان: scope -> (حداکثر تلاش، طول پنجره به ثانیه)
+# برای ورود فقط تلاش‌های ناموفق شمرده می‌شوند؛ برای ثبت‌نام همه درخواست‌های POST
+LOGIN_THROTTLE = {
+    "ip": (int(os.environ.get("LOGIN_THROTTLE_IP", 30)), 5 * 60),
+    "account": (int(os.environ.get("LOGIN_THROTTLE_ACCOUNT", 5)), 15 * 60),
+}
+
+REGISTER_THROTTLE = {
+    "ip": (int(os.environ.get("REGISTER_THROTTLE_IP", 10)), 60 * 60),
+}
+
+# پشت load balancer مقدار HTTP_X_FORWARDED_FOR بگذارید
+CLIENT_IP_HEADER = os.environ.get("CLIENT_IP_HEADER", "REMOTE_ADDR")
+
+
+# -----------------------------
+# CATALOG SETTINGS
+# -----------------------------
+PRODUCTS_PER_PAGE = int(os.environ.get("PRODUCTS_PER_PAGE", 24))
+
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 60 * 60))
+
+# کش کامل صفحه‌های کاتالوگ برای کاربران مهمان
+CATALOG_PAGE_CACHE = os.environ.get("CATALOG_PAGE_CACHE", "1") == "1"
+
+
+# تصاویر محصول: نسخه‌های WebP/JPEG در این عرض‌ها (پیکسل) بعد از ذخیره ساخته می‌شوند
+PRODUCT_THUMBNAIL_WIDTHS = (200, 400, 800)
+
+
+# -----------------------------
+# BACKGROUND JOBS
+# -----------------------------
+# کارهای بعد از درخواست (ایمیل سفارش، تصاویر کوچک) در صف دیتابیسی auth_app.jobs
+# می‌روند و manage.py run_worker آن‌ها را اجرا می‌کند (پروسه worker در Procfile؛
+# بدون آن ایمیل‌ها فرستاده نمی‌شوند و با replica نسخه کاتالوگ بعد از تاخیر
+# replication دوباره عوض نمی‌شود). با JOBS_EAGER=1 بدون worker و بعد از commit
+# همان‌جا اجرا می‌شوند؛ کارهای با تاخیر در thread پس‌زمینه بعد از تاخیرشان.
+JOBS_EAGER = os.environ.get("JOBS_EAGER", "0") == "1"
+
+JOB_MAX_ATTEMPTS = 5
+
+# تاخیر تلاش دوباره (ثانیه) با هر شکست دو برابر می‌شود تا سقف JOB_RETRY_MAX_DELAY
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+
+# کاری که این مدت (ثانیه) در حال اجرا مانده، یعنی worker آن از کار افتاده است
+JOB_LOCK_TIMEOUT = 15 * 60
+
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "shop@localhost")
+
+
+# -----------------------------
+# CART SETTINGS
+# -----------------------------
+# auth_app.cart_store.DatabaseCartStore یا auth_app.cart_store.CacheCartStore
+# (CacheCartStore به کش مشترک با add اتمی مثل redis یا memcached نیاز دارد)
+CART_STORE = os.environ.get("CART_STORE", "auth_app.cart_store.DatabaseCartStore")
+
+CART_CACHE_TIMEOUT = int(os.environ.get("CART_CACHE_TIMEOUT", 60 * 60 * 24 * 30))
+
+# تعداد سفارش در هر صفحه تاریخچه سفارش‌ها (/orders/)
+ORDERS_PER_PAGE = int(os.environ.get("ORDERS_PER_PAGE", 10))
+
+
+# -----------------------------
+# REQUEST TIMING
+# -----------------------------
+# سهم درخواست‌هایی که زمان و کوئری‌هایشان اندازه‌گیری می‌شود (۰ تا ۱)؛ در پروداکشن
+# یک درصد برای پیدا کردن درخواست‌های کند کافی است
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get("REQUEST_TIMING_SAMPLE_RATE", 1.0 if DEBUG else 0.01))
+
+# درخواست‌های کندتر از این مقدار (میلی‌ثانیه) با کوئری‌های تکراری‌شان لاگ می‌شوند
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 500))
+
+SLOW_REQUEST_TOP_QUERIES = 5
+
+
+# -----------------------------
+# CACHE
+# -----------------------------
+# نسخه کاتالوگ (bump_version)، شمارنده‌های محدودیت ورود و خلاصه سبد در کش‌اند و
+# باید بین همه workerها مشترک باشند؛ با LocMemCache هر worker کش جدای خودش را دارد
+# و تغییر محصول فقط در یکی از آن‌ها دیده می‌شود. پیش‌فرض پروداکشن کش فایلی
+# مشترک بین workerهای همان سرور است؛ با چند سرور CACHE_BACKEND و CACHE_LOCATION را
+# روی بک‌اند شبکه‌ای (مثلاً redis) بگذارید. در DEBUG (runserver و تست‌ها) یک پروسه
+# داریم و کش داخل حافظه کافی است.
+#
+# کش فایلی و LocMemCache وقتی به CACHE_MAX_ENTRIES برسند یک سوم کلیدها را
+# (بدون توجه به کاربردشان) پاک می‌کنند؛ پیش‌فرض جنگو (۳۰۰) برای صفحه‌های کاتالوگ،
+# شمارنده‌های ورود و خلاصه سبدها کم است. کش فایلی در هر set فهرست فایل‌ها را
+# می‌شمارد، پس برای ترافیک بالا بک‌اند شبکه‌ای بهتر است.
+if DEBUG:
+    DEFAULT_CACHE = ("django.core.cache.backends.locmem.LocMemCache", "morseshop")
+    STATS_CACHE = ("django.core.cache.backends.locmem.LocMemCache", "morseshop-stats")
+else:
+    DEFAULT_CACHE = ("django.core.cache.backends.filebased.FileBasedCache", "/var/tmp/morseshop-cache")
+    STATS_CACHE = ("django.core.cache.backends.filebased.FileBasedCache", "/var/tmp/morseshop-stats")
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", DEFAULT_CACHE[0]),
+        "LOCATION": os.environ.get("CACHE_LOCATION", DEFAULT_CACHE[1]),
+    },
+    # شمارنده‌های hit/miss کاتالوگ (catalog.stats) جدا نگه داشته می‌شوند تا
+    # نوشتن‌شان کلیدهای کش اصلی را cull نکند
+    "stats": {
+        "BACKEND": os.environ.get("STATS_CACHE_BACKEND", STATS_CACHE[0]),
+        "LOCATION": os.environ.get("STATS_CACHE_LOCATION", STATS_CACHE[1]),
+    },
+}
+
+# OPTIONS بقیه بک‌اندها (redis، memcached) به کلاینتشان داده می‌شود و MAX_ENTRIES ندارند
+if CACHES["default"]["BACKEND"] in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.filebased.FileBasedCache",
+):
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 10000))}
+
+# سهم درخواست‌هایی که در شمارنده‌های hit/miss کاتالوگ حساب می‌شوند (۰ تا ۱)؛
+# نسبت hit به miss با نمونه‌برداری هم درست می‌ماند
+CATALOG_STATS_SAMPLE_RATE = float(os.environ.get("CATALOG_STATS_SAMPLE_RATE", 1.0 if DEBUG else 0.01))
+
+
+# -----------------------------
+# SESSIONS & MESSAGES
+# -----------------------------
+# مهمان‌ها session ندارند (سبدشان تا ورود خالی است و پیام‌ها در کوکی امضاشده‌اند)؛
+# session فقط با ورود ساخته می‌شود. با کش مشترک بهتر است
+# django.contrib.sessions.backends.cached_db باشد (با LocMemCache هر worker کش
+# جدای خودش را دارد و خروج در بقیه workerها دیده نمی‌شود) یا signed_cookies
+# که اصلا به دیتابیس نمی‌رود.
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "django.contrib.sessions.backends.db")
+
+# بدون fallback به session؛ پیام‌های بیش از ظرفیت کوکی (۲.۵ کیلوبایت) قدیمی‌ها را کنار می‌گذارند
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
 
 # -----------------------------
 # Bootstrap messages mapping
@@ -133,5 +310,16 @@ MESSAGE_TAGS = {
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+MEDIA_URL = "/media/"
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", BASE_DIR / "media"))
+
+# در پروداکشن وب‌سرور یا storage ابری media را سرو می‌کند؛ پیش‌فرض فقط در DEBUG
+SERVE_MEDIA = os.environ.get("SERVE_MEDIA", "1" if DEBUG else "0") == "1"
+
+# نام فایل‌های استاتیک هش محتوا دارد و نسخه gzip/brotli آن‌ها از قبل ساخته می‌شود
+# (auth_app.storage)؛ collectstatic در build.sh همیشه manifest را می‌سازد.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "auth_app.storage.StaticFilesStorage"},
+}
 
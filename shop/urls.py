@@ -14,10 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+from auth_app import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('',include('auth_app.url'))
 ]
+
+if settings.SERVE_MEDIA:
+    urlpatterns.append(re_path(r"^{}(?P<path>.*)$".format(settings.MEDIA_URL.lstrip("/")), views.media))